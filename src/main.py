@@ -1,19 +1,39 @@
 import tkinter
 import tkinter.filedialog
+import tkinter.messagebox
 import customtkinter as ctk
 import edge_tts
 import asyncio
+import concurrent.futures
+import contextlib
 import threading
 import os
 import tempfile
 import json
+import shutil
 from playsound import playsound # Using playsound 1.2.2
-import time # For small delay in search
-import docx  # For DOCX files
-import chardet  # For detecting text file encodings
 import tkinter.ttk as ttk
 import pygame  # For advanced audio playback
 from utils.voice_cache import load_cached_voices, save_voices_to_cache, get_cache_status, clear_cache
+from utils.event_loop import AsyncLoopService
+from utils.synthesis_cache import SynthesisCache, MemoryChunkStore, make_cache_key, DEFAULT_MAX_CACHE_BYTES
+from utils.read_ahead import ReadAheadScheduler, READ_AHEAD_PARAGRAPHS
+from utils.timing_index import WordTimingIndex
+from utils.text_index import TextIndexMap
+from utils.mp3 import get_mp3_duration, Mp3SeekIndex
+from utils.playback import PlaybackController
+from utils.audio_engine import AudioEngine
+from utils.synthesis import (
+    split_text_into_chunks, iter_synthesized_chunks, fetch_chunk, format_prosody, estimate_audio_duration,
+    completed_sentences, trailing_paragraphs, rebase_word_timings, rate_limiter, DEFAULT_CONCURRENCY, CONNECTION_ERRORS
+)
+from utils.splice import SynthesisSession, SESSION_MAX_BYTES
+from utils.export_journal import ExportJournal
+from utils.text_loader import read_text_file
+from utils.docx_reader import read_docx
+from utils.rtf import read_rtf
+from utils.documents import open_document, DOCUMENT_EXTENSIONS
+from utils.text_window import TextWindow, LARGE_DOCUMENT_CHARS
 from PIL import Image, ImageTk  # For icon support
 import random
 import logging
@@ -132,6 +152,7 @@ def handle_error(error, error_type="Error", show_message=True, parent=None):
 MAX_RETRIES = 3
 INITIAL_RETRY_DELAY = 1  # seconds
 MAX_RETRY_DELAY = 10  # seconds
+CANCEL_WAIT_SECONDS = 5  # How long a stopped synthesis is given to close the files it writes
 
 async def retry_async_operation(operation, *args, **kwargs):
     """
@@ -178,6 +199,10 @@ TEMP_AUDIO_FILENAME = "temp_audio_edge_tts1.mp3"  # Keep MP3 as default for temp
 DEFAULT_TEXT = "Hello, this is a test of Microsoft Edge Text-to-Speech with CustomTkinter."
 DEFAULT_VOICE = "JennyNeural (en-US)"  # Default voice to select when loading voices
 CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".edge_tts_gui_config.json")  # Config file in user's home directory
+TYPE_AHEAD_DELAY_MS = 800  # Typing pause after which finished sentences are synthesized
+TYPE_AHEAD_PARAGRAPHS = 2  # Paragraphs before the cursor considered for type-ahead synthesis
+TEXT_WINDOW_POLL_MS = 200  # How often the view of a large document is checked for paging
+FOLLOWING_TEXT_CHARS = 50_000  # Text after the spoken range handed to read-ahead in a large document
 
 # Color scheme
 COLORS = {
@@ -234,6 +259,9 @@ SUPPORTED_INPUT_FORMATS = [
     ("Text files", "*.txt"),
     ("Word documents", "*.docx"),
     ("Rich Text Format", "*.rtf"),
+    ("EPUB e-books", "*.epub"),
+    ("HTML files", "*.html *.htm *.xhtml"),
+    ("Markdown files", "*.md *.markdown"),
     ("All files", "*.*")
 ]
 
@@ -937,10 +965,6 @@ class EdgeTTSApp(ctk.CTk):
         # Try to set application icon
         self._set_app_icon()
 
-        # Initialize pygame mixer
-        pygame.mixer.init()
-        pygame.mixer.quit()  # Quit immediately to free resources
-        
         self.title(WINDOW_TITLE)
         self.geometry(WINDOW_SIZE)
         self.minsize(800, 600)  # Set minimum window size
@@ -962,12 +986,23 @@ class EdgeTTSApp(ctk.CTk):
 
         # Audio playback state
         self.is_paused = False
-        self.current_audio_file = None
         self.audio_length = 0
         self.update_progress_id = None
-        self.current_word_index = 0
+        self.current_word_index = -1
         self.word_timings = []
+        self.timing_index = WordTimingIndex()
+        self.seek_index = Mp3SeekIndex()  # Frame offsets of the current audio, for seeking
+        self.highlight_range = None  # Text widget indices of the highlighted word
+        self.text_index_map = TextIndexMap("")  # Maps synthesized text offsets to widget indices
+        self.speak_offset = 0  # Document offset of the synthesized text in a large document
+        self.text_window_poll_id = None
         self.word_highlight_id = None
+        self.playback = PlaybackController()  # Completion and stop of main playback
+        self.preview_playback = PlaybackController()
+        self.preview_future = None
+
+        # Text, settings, audio files and word timings of the most recent synthesis
+        self.last_synthesis = None
         
         # Configure grid layout (3x1)
         self.grid_rowconfigure(1, weight=1)
@@ -1051,6 +1086,21 @@ class EdgeTTSApp(ctk.CTk):
         )
         self.load_file_button.grid(row=0, column=2, padx=(0, 10))
 
+        # Chapter selector, shown for documents with more than one chapter
+        self.document = None
+        self.chapter_index = 0
+        self.chapter_menu = ctk.CTkOptionMenu(
+            header_frame,
+            values=[""],
+            height=32,
+            command=self.on_chapter_selected,
+            dynamic_resizing=False,
+            font=ctk.CTkFont(size=13),
+            fg_color=COLORS["secondary"],
+            button_color=COLORS["secondary"],
+            button_hover_color=COLORS["primary"]
+        )
+
         # Text input with modern styling
         self.text_input = ctk.CTkTextbox(
             text_frame,
@@ -1063,6 +1113,9 @@ class EdgeTTSApp(ctk.CTk):
         )
         self.text_input.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
         self.text_input.insert("1.0", DEFAULT_TEXT)
+        self.text_input.tag_config("highlight", background="yellow", foreground="black")
+        # Very large documents are kept outside the widget, which shows a window of them
+        self.text_window = TextWindow(self.text_input)
         # Bind Ctrl+A to select all text
         self.text_input.bind("<Control-a>", self.select_all_text)
         self.text_input.bind("<Control-A>", self.select_all_text)
@@ -1091,6 +1144,8 @@ class EdgeTTSApp(ctk.CTk):
 
         # Bind text changes to update both counters
         self.text_input.bind('<KeyRelease>', self.update_text_stats)
+        self.text_input.bind('<<Modified>>', self.on_text_modified)
+        self.text_input.bind('<KeyRelease>', self.schedule_type_ahead)
         self.update_text_stats(None)  # Initial count
 
         # Create main content frame
@@ -1103,15 +1158,52 @@ class EdgeTTSApp(ctk.CTk):
         self.voices_list_full = []
         self.voice_map = {}
         self.display_voices_full = []
-        self.last_selected_voice = self.load_config().get('last_voice', DEFAULT_VOICE)
+        config = self.load_config()
+        self.last_selected_voice = config.get('last_voice', DEFAULT_VOICE)
+        self.synthesis_concurrency = config.get('synthesis_concurrency', DEFAULT_CONCURRENCY)
+        rate_limiter.configure(chars_per_second=config.get('synthesis_chars_per_second'))
+        self.streaming_playback = config.get('streaming_playback', True)
+        self.synthesis_cache = SynthesisCache(
+            max_bytes=int(config.get('synthesis_cache_mb', DEFAULT_MAX_CACHE_BYTES // (1024 * 1024)) * 1024 * 1024)
+        )
         self.is_speaking = False
         self.stop_requested = threading.Event()
         self.initial_text_set = False  # Flag to track if initial text has been set
 
+        # Long-lived event loop that all network work runs on
+        self.loop_service = AsyncLoopService()
+        self.loop_service.start()
+        self.synthesis_future = None
+
+        # Chunks synthesized ahead of playback are kept in memory in front of the disk cache
+        self.chunk_store = MemoryChunkStore(self.synthesis_cache)
+        self.read_ahead = ReadAheadScheduler(
+            self.loop_service,
+            self.chunk_store,
+            paragraphs=config.get('read_ahead_paragraphs', READ_AHEAD_PARAGRAPHS)
+        )
+
+        # Opt-in synthesis of finished sentences while the user is typing
+        self.type_ahead_var = tkinter.BooleanVar(value=config.get('type_ahead_synthesis', False))
+        self.type_ahead = ReadAheadScheduler(self.loop_service, self.chunk_store, concurrency=1)
+        self.type_ahead_id = None
+
+        # Per-sentence audio of recent syntheses, spliced into the next one after an edit
+        self.session_store = MemoryChunkStore(self.chunk_store, max_bytes=SESSION_MAX_BYTES)
+        self.synthesis_session = SynthesisSession(self.session_store)
+
+        # Audio device stays open for the lifetime of the app
+        self.audio = AudioEngine()
+        try:
+            self.audio.start()
+        except Exception as e:
+            logging.warning(f"Audio device unavailable, retrying on playback: {e}")
+
         # Setup UI components
         self.setup_voice_selection()
         self.setup_controls()
         self.setup_status_section()
+        self.audio.set_volume(self.volume_slider.get() / 100)
 
         # Initially set English text (will be updated after voices load)
         self.text_input.insert("1.0", DEFAULT_TEXTS["en"])
@@ -1204,7 +1296,7 @@ class EdgeTTSApp(ctk.CTk):
 
             # Run the async operation with retry
             try:
-                voices_manager = asyncio.run(load_voices_with_retry())
+                voices_manager = self.loop_service.run(load_voices_with_retry())
                 self.voices_list_full = voices_manager.voices
                 
                 # Save to cache if successful
@@ -1309,15 +1401,55 @@ class EdgeTTSApp(ctk.CTk):
     def save_config(self):
         """Save configuration to file"""
         try:
-            config = {
-                'last_voice': self.voice_combobox.get()
-            }
-            os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(config, f)
+            config = self.load_config()
+            config['last_voice'] = self.voice_combobox.get()
+            config['type_ahead_synthesis'] = self.type_ahead_var.get()
+            self._write_config(config)
         except Exception as e:
             print(f"Error saving config: {e}")
 
+    def _write_config(self, config):
+        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
+        with open(CONFIG_FILE, 'w') as f:
+            json.dump(config, f)
+
+    def _update_pending_exports(self, add=None, remove=None):
+        """Add or remove an export journal path in the config, so interrupted exports are found on restart"""
+        try:
+            config = self.load_config()
+            pending = [path for path in config.get('pending_exports', []) if path != remove]
+            if add and add not in pending:
+                pending.append(add)
+            config['pending_exports'] = pending
+            self._write_config(config)
+        except Exception as e:
+            logging.warning(f"Failed to update pending exports: {e}")
+
+    def check_pending_exports(self):
+        """Offer to resume an export that was interrupted by a crash or a failed synthesis"""
+        if self.is_speaking:
+            return
+        for path in self.load_config().get('pending_exports', []):
+            journal = ExportJournal.load(path)
+            if journal is None:
+                self._update_pending_exports(remove=path)
+                continue
+            name = os.path.basename(journal.output_path)
+            resume = tkinter.messagebox.askyesno(
+                "Resume Export",
+                f"Saving {name} was interrupted after {journal.next_index} of {len(journal.chunks)} parts.\n\n"
+                "Resume it? Choosing No discards the partial file.",
+                parent=self
+            )
+            if resume:
+                # One export at a time; _export_speech offers the others once this one is done
+                self._set_speaking_state(True)
+                self.update_detailed_status(f"Resuming save to {name}...")
+                threading.Thread(target=self._export_speech, args=(journal.text, journal.voice, journal.output_path, journal), daemon=True).start()
+                return
+            journal.discard()
+            self._update_pending_exports(remove=path)
+
     def update_voice_combobox_post_load(self):
         """Update the combobox with loaded voices"""
         if self.display_voices_full:
@@ -1339,6 +1471,7 @@ class EdgeTTSApp(ctk.CTk):
             self.speak_button.configure(state="normal")
             self.save_button.configure(state="normal")
             self.update_detailed_status("Voices loaded. Ready.")
+            self.after(0, self.check_pending_exports)
 
             # Set the correct initial text based on the selected voice
             if not self.initial_text_set:
@@ -1358,6 +1491,7 @@ class EdgeTTSApp(ctk.CTk):
 
     def on_voice_selected_from_combobox(self, choice):
         """Handle voice selection change"""
+        self.read_ahead.invalidate()
         voice_name = self.voice_map.get(choice)
         if voice_name:
             # Only update text if it's the default text
@@ -1369,46 +1503,72 @@ class EdgeTTSApp(ctk.CTk):
         # Save the selected voice to config
         self.save_config()
 
-    def get_text_from_cursor(self):
-        """Get text from cursor position to the end of the text. If cursor is at end or not present, return the whole text."""
+    def _get_speak_range(self):
+        """Return the (start, end) widget indices of the text that Speak should read"""
         try:
-            cursor_pos = self.text_input.index("insert")
-            end_pos = self.text_input.index("end-1c")
-            # If cursor is at the end, treat as 'read all'
-            if cursor_pos == end_pos:
-                text = self.text_input.get("1.0", "end-1c")
-            else:
-                text = self.text_input.get(cursor_pos, "end-1c")
-            return text.strip()
-        except Exception as e:
-            logging.error(f"Error getting text from cursor: {e}")
-            return ""
+            start, end = self.text_input.index("sel.first"), self.text_input.index("sel.last")
+            if self.text_input.get(start, end).strip():
+                return start, end
+        except tkinter.TclError:  # No selection
+            pass
+        cursor_pos = self.text_input.index("insert")
+        end_pos = self.text_input.index("end-1c")
+        # If cursor is at the end, or only whitespace follows it, read all
+        if cursor_pos != end_pos and self.text_input.get(cursor_pos, end_pos).strip():
+            return cursor_pos, end_pos
+        return "1.0", end_pos
+
+    def _get_speak_offsets(self):
+        """Return the (start, end) document offsets Speak should read in a large document"""
+        try:
+            start = self.text_window.to_offset(self.text_input.index("sel.first"))
+            end = self.text_window.to_offset(self.text_input.index("sel.last"))
+            if self.text_window.text(start, end).strip():
+                return start, end
+        except tkinter.TclError:  # No selection
+            pass
+        # The window is only part of the document, so read on from the cursor to its end
+        start, end = self.text_window.to_offset("insert"), len(self.text_window)
+        if self.text_window.text(start, end).strip():
+            return start, end
+        return 0, end
 
     def on_speak(self):
         if self.is_speaking: return
 
-        # Try to get selected text first
-        try:
-            text = self.text_input.get("sel.first", "sel.last").strip()
-            if not text:  # No selection, try getting text from cursor
-                text = self.get_text_from_cursor()
-                if not text:
-                    # Fallback: read all text
-                    text = self.text_input.get("1.0", "end-1c").strip()
-        except tkinter.TclError:  # No selection
-            text = self.get_text_from_cursor()
-            if not text:
-                text = self.text_input.get("1.0", "end-1c").strip()
+        # Read the selection, else from the cursor, else the whole text
+        if self.text_window.is_active:
+            start, end = self._get_speak_offsets()
+            raw_text = self.text_window.text(start, end)
+        else:
+            start_index, end_index = self._get_speak_range()
+            raw_text = self.text_input.get(start_index, end_index)
+        text = raw_text.strip()
 
         if not text:
             self.update_detailed_status("Error: No text to read.")
             return
 
+        # Map offsets within the spoken slice back to widget indices for highlighting
+        leading_whitespace = len(raw_text) - len(raw_text.lstrip())
+        if self.text_window.is_active:
+            self.speak_offset = start + leading_whitespace
+        else:
+            base_offset = len(self.text_input.get("1.0", start_index)) + leading_whitespace
+            self.text_index_map = TextIndexMap(self.text_input.get("1.0", "end-1c"), base_offset)
+
         selected_voice_short_name = self.get_selected_voice_short_name()
         if not selected_voice_short_name:
             self.update_detailed_status("Error: No valid voice selected.")
             return
 
+        # Text after the spoken range is synthesized ahead once this synthesis is done
+        if self.text_window.is_active:
+            following_text = self.text_window.text(end, end + FOLLOWING_TEXT_CHARS)
+        else:
+            following_text = self.text_input.get(end_index, "end-1c")
+        rate, pitch = format_prosody(self.rate_slider.get(), self.pitch_slider.get())
+
         self._set_speaking_state(True)
         self.update_detailed_status(f"Synthesizing with {selected_voice_short_name}...")
 
@@ -1416,31 +1576,56 @@ class EdgeTTSApp(ctk.CTk):
         temp_audio_path = os.path.join(temp_dir, TEMP_AUDIO_FILENAME)
 
         def synthesis_and_playback_thread():
+            streaming = self.streaming_playback
+            success = False
+            keep_audio = False
+            # The temp files of the previous result are about to be overwritten
+            self._forget_last_synthesis()
             try:
-                success = self._synthesize_speech(text, selected_voice_short_name, temp_audio_path)
+                if streaming:
+                    # Start playback as soon as the first chunk arrives; each chunk
+                    # is played as its own segment, so no combined file is written
+                    self._reset_stream()
+                    self.playback.begin()
+                    success = self._synthesize_speech(
+                        text,
+                        selected_voice_short_name,
+                        None,
+                        on_chunk=lambda index, audio, timings: self._on_stream_chunk(temp_audio_path, index, audio)
+                    )
+                    self.audio.end_sequence()
+                else:
+                    success = self._synthesize_speech(text, selected_voice_short_name, temp_audio_path)
+                # The read-ahead was left running so chunks it was already
+                # streaming for this text were joined instead of restarted
+                self.read_ahead.cancel()
 
                 if self.stop_requested.is_set():
                     self.after(0, self.update_detailed_status, "Speak operation stopped.")
-                    if os.path.exists(temp_audio_path): os.remove(temp_audio_path)
+                    self._discard_partial_output(temp_audio_path)
                     return
 
                 if success:
-                    self.after(0, self.update_detailed_status, "Playing audio...")
+                    # Keep the audio so Save As can reuse it without synthesizing again
+                    keep_audio = True
+                    audio_paths = [path for path, _, _ in self.audio.segments] if streaming else [temp_audio_path]
+                    self._remember_synthesis(text, selected_voice_short_name, rate, pitch, audio_paths)
+                    # The network is idle during playback, so synthesize the next paragraphs
+                    self.read_ahead.schedule(following_text, selected_voice_short_name, rate, pitch)
+                    if not streaming:
+                        self.after(0, self.update_detailed_status, "Playing audio...")
                     if self.stop_requested.is_set():
                         self.after(0, self.update_detailed_status, "Speak operation stopped before playback.")
-                        if os.path.exists(temp_audio_path): os.remove(temp_audio_path)
+                        self._discard_partial_output(temp_audio_path)
                         return
 
                     try:
-                        self.current_audio_file = temp_audio_path
-                        self.play_audio(temp_audio_path)
+                        if not streaming:
+                            self.play_audio(temp_audio_path)
                         
-                        # Wait for playback to finish
-                        while pygame.mixer.get_init() and (pygame.mixer.music.get_busy() or self.is_paused):
-                            if self.stop_requested.is_set():
-                                break
-                            time.sleep(0.1)
-                            
+                        # Wait for the progress tick to report the end, or for a stop
+                        self.playback.wait()
+
                         if not self.stop_requested.is_set():
                             self.after(0, self.update_detailed_status, "Playback finished. Ready.")
                         else:
@@ -1448,15 +1633,13 @@ class EdgeTTSApp(ctk.CTk):
                     except Exception as e:
                         if not self.stop_requested.is_set():
                             self.after(0, self.update_detailed_status, f"Error playing audio: {e}")
-                    finally:
-                        # Only try to remove the file if mixer is not initialized or not busy
-                        try:
-                            if not pygame.mixer.get_init() or not pygame.mixer.music.get_busy():
-                                if os.path.exists(temp_audio_path):
-                                    os.remove(temp_audio_path)
-                        except Exception as e_del:
-                            print(f"Error deleting temp file: {e_del}")
             finally:
+                if streaming and not keep_audio:
+                    if not success:
+                        # The first chunks may already be playing; stop before their files go
+                        self.audio.stop()
+                        self.playback.stop()
+                    self._remove_stream_segments()
                 if not self.stop_requested.is_set():
                     self.after(0, lambda: self._set_speaking_state(False))
 
@@ -1481,40 +1664,29 @@ class EdgeTTSApp(ctk.CTk):
                 raise FileOperationError("Audio file is empty")
                 
             logging.info(f"Starting audio playback: {audio_path}")
+            self.playback.begin()
             logging.info(f"Number of word timings available: {len(self.word_timings)}")
             
-            # Safely quit any existing mixer
+            # The audio device is already open, so only the track has to be loaded
             try:
-                if pygame.mixer.get_init():
-                    pygame.mixer.quit()
-                    logging.debug("Successfully quit existing mixer")
-            except Exception as e:
-                logging.warning(f"Error while quitting existing mixer: {e}")
-            
-            # Initialize mixer with error handling
-            try:
-                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
-                logging.debug("Mixer initialized successfully")
+                self.audio.start()
             except Exception as e:
                 raise AudioError(f"Failed to initialize audio system: {e}")
             
-            # Load and prepare audio
+            # Prepare audio
             try:
-                pygame.mixer.music.load(audio_path)
-                pygame.mixer.music.set_volume(self.volume_slider.get() / 100)
-                
-                # Get audio length
-                audio = pygame.mixer.Sound(audio_path)
-                self.audio_length = audio.get_length()
+                # Get audio length from the MP3 headers instead of decoding the file
+                self.audio_length = self._get_audio_length(audio_path)
                 self.total_time.configure(text=self.format_time(self.audio_length))
                 
                 logging.debug(f"Audio loaded successfully. Length: {self.audio_length}s")
             except Exception as e:
-                raise AudioError(f"Failed to load audio file: {e}")
+                raise AudioError(f"Failed to read audio file: {e}")
             
             # Start playback
             try:
-                pygame.mixer.music.play()
+                # The seek index was built while this file was written
+                self.audio.play_file(audio_path, self.audio_length, self.seek_index)
                 logging.info("Audio playback started")
                 
                 # Start progress updates
@@ -1532,21 +1704,90 @@ class EdgeTTSApp(ctk.CTk):
             handle_error(e, "Unexpected Error", parent=self)
             self._cleanup_audio_system()
 
+    def _get_audio_length(self, audio_path):
+        """Get the duration of an audio file without decoding it"""
+        try:
+            duration = get_mp3_duration(audio_path)
+            if duration:
+                return duration
+        except Exception as e:
+            logging.warning(f"Could not read MP3 duration from headers: {e}")
+        # Fall back to the end of the last spoken word
+        return self.word_timings[-1]['end'] if self.word_timings else 0
+
     def _cleanup_audio_system(self):
         """Safely clean up the audio system"""
         try:
-            if pygame.mixer.get_init():
-                pygame.mixer.quit()
+            self.audio.stop()
+            self.playback.stop()
             self._set_speaking_state(False)
             logging.info("Audio system cleaned up")
         except Exception as e:
             logging.error(f"Error during audio system cleanup: {e}")
 
+    def _reset_stream(self):
+        """Start an empty playback sequence for the chunks of a new synthesis"""
+        self.audio.new_sequence()
+        self.audio_length = 0
+
+    def _on_stream_chunk(self, base_path, index, audio):
+        """Write a synthesized chunk to its own segment file and add it to the playback sequence"""
+        segment_path = f"{os.path.splitext(base_path)[0]}_{index:04d}.mp3"
+        with open(segment_path, "wb") as segment_file:
+            segment_file.write(audio)
+
+        frames = Mp3SeekIndex()
+        frames.feed(audio)
+        self.audio.add_segment(segment_path, estimate_audio_duration(audio), frames)
+        self.audio_length = self.audio.length
+        self.after(0, lambda: self.total_time.configure(text=self.format_time(self.audio_length)))
+
+        if index == 0:
+            self.after(0, self._start_stream_playback)
+
+    def _start_stream_playback(self):
+        """Start playing the first streamed segment while the rest is synthesized"""
+        if self.stop_requested.is_set() or not self.playback.is_active or not self.audio.segments:
+            return
+        try:
+            self.audio.seek(0.0)
+            logging.info("Streaming playback started")
+            self.update_detailed_status("Playing audio...")
+            self.update_progress()
+        except Exception as e:
+            handle_error(AudioError(f"Failed to start streaming playback: {e}"), "Audio Error", parent=self)
+            self._cleanup_audio_system()
+
+    def _remove_stream_segments(self):
+        """Delete the segment files written during streaming playback"""
+        for segment_path, _, _ in self.audio.segments:
+            try:
+                if os.path.exists(segment_path):
+                    os.remove(segment_path)
+            except Exception as e:
+                logging.warning(f"Failed to remove stream segment {segment_path}: {e}")
+
     def update_progress(self):
         """Update progress bar and word highlighting"""
-        if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+        if self.is_paused:
+            # Nothing moves while paused; resuming restarts the updates
+            self.update_progress_id = None
+            return
+        try:
+            # Queue the next segment so the sequence plays without gaps
+            playing = self.audio.update()
+        except Exception as e:
+            logging.error(f"Error advancing playback: {e}")
+            playing = self.audio.is_busy()
+        if not playing:
+            self.audio.stop()  # Release the finished track so its file can be removed
+            self.playback.finish()
+            self._reset_progress()
+            return
+
+        if self.audio.is_busy():
             try:
-                current_pos = pygame.mixer.music.get_pos() / 1000.0  # Convert to seconds
+                current_pos = self.audio.position()
                 if current_pos >= 0:  # Only update if we have a valid position
                     progress = current_pos / self.audio_length if self.audio_length > 0 else 0
                     self.progress_bar.set(progress)
@@ -1559,67 +1800,59 @@ class EdgeTTSApp(ctk.CTk):
             except Exception as e:
                 logging.error(f"Error updating progress: {e}")
             
-            # Schedule next update
-            self.update_progress_id = self.after(50, self.update_progress)
-        else:
-            self._reset_progress()
+        # Schedule next update, also while waiting for the next segment to be synthesized
+        self.update_progress_id = self.after(50, self.update_progress)
 
     def highlight_current_word(self, current_time):
         """Highlight only the current word being spoken, not all occurrences."""
-        self.text_input.tag_remove("highlight", "1.0", "end")
         if not self.word_timings:
             logging.warning("No word timings available for highlighting")
             return
-        logging.debug(f"Current playback time: {current_time:.2f}s")
-        text_content = self.text_input.get("1.0", "end-1c")
-        for word_info in self.word_timings:
-            start_time = word_info['start']
-            end_time = word_info['end']
-            tolerance = 0.05  # 50ms tolerance
-            if (start_time - tolerance) <= current_time <= (end_time + tolerance):
-                word = word_info['text']
-                offset = word_info['offset'] // 2  # EdgeTTS offset is in UTF-16 code units, Python uses UTF-8/Unicode codepoints
-                # Convert offset to Python string index
-                # This works for most cases unless there are surrogate pairs (rare in Turkish/English)
-                try:
-                    # Find the start and end index in the text widget
-                    start_idx = self._char_index_to_text_index(offset)
-                    end_idx = self._char_index_to_text_index(offset + len(word))
-                    self.text_input.tag_add("highlight", start_idx, end_idx)
-                    self.text_input.tag_config("highlight", background="yellow", foreground="black")
-                    self.text_input.see(start_idx)
-                    logging.debug(f"Highlighted word '{word}' at {start_idx}-{end_idx}")
-                except Exception as e:
-                    logging.error(f"Error highlighting word at offset {offset}: {e}")
-                return
-        logging.debug(f"No word found for time {current_time:.2f}s")
+        # Index timings that arrived since the last update (streaming adds them during playback)
+        if len(self.timing_index) < len(self.word_timings):
+            self.timing_index.extend(self.word_timings[len(self.timing_index):])
+
+        index = self.timing_index.find(current_time)
+        if index == self.current_word_index:
+            return  # Same word as the previous frame, nothing to redraw
+        self._clear_word_highlight()
+        self.current_word_index = index
+        if index < 0:
+            logging.debug(f"No word found for time {current_time:.2f}s")
+            return
+
+        start, end = self.timing_index.span(index)
+        try:
+            # Find the start and end index in the text widget
+            start_idx = self._char_index_to_text_index(start)
+            end_idx = self._char_index_to_text_index(end)
+            self.text_input.tag_add("highlight", start_idx, end_idx)
+            self.text_input.see(start_idx)
+            self.highlight_range = (start_idx, end_idx)
+            logging.debug(f"Highlighted word {index} at {start_idx}-{end_idx}")
+        except Exception as e:
+            logging.error(f"Error highlighting word at offset {start}: {e}")
+
+    def _clear_word_highlight(self):
+        """Remove the highlight from the previously highlighted word"""
+        if self.highlight_range:
+            self.text_input.tag_remove("highlight", *self.highlight_range)
+            self.highlight_range = None
 
     def _char_index_to_text_index(self, char_index):
-        """Convert a character index to a Tkinter text widget index (line.char format)."""
-        text = self.text_input.get("1.0", "end-1c")
-        # Clamp char_index to text length
-        char_index = min(char_index, len(text))
-        # Tkinter text widget is 1-based for lines, 0-based for columns
-        line = 1
-        col = 0
-        count = 0
-        for i, c in enumerate(text):
-            if count == char_index:
-                break
-            if c == '\n':
-                line += 1
-                col = 0
-            else:
-                col += 1
-            count += 1
-        return f"{line}.{col}"
+        """Convert a character index in the synthesized text to a Tkinter text widget index (line.char format)."""
+        if self.text_window.is_active:
+            # Moves the window along with playback
+            return self.text_window.index_of(self.speak_offset + char_index)
+        return self.text_index_map.to_tk_index(char_index)
 
     def _reset_progress(self):
         """Reset progress-related UI elements"""
         try:
             self.progress_bar.set(0)
             self.current_time.configure(text="0:00")
-            self.text_input.tag_remove("highlight", "1.0", "end")
+            self._clear_word_highlight()
+            self.current_word_index = -1
             
             if self.update_progress_id:
                 self.after_cancel(self.update_progress_id)
@@ -1628,7 +1861,7 @@ class EdgeTTSApp(ctk.CTk):
             # Only reset speaking state if we're not paused and mixer is initialized
             if not self.is_paused:
                 try:
-                    if pygame.mixer.get_init() and not pygame.mixer.music.get_busy():
+                    if self.audio.is_ready and not self.audio.is_busy():
                         self._cleanup_audio_system()
                 except pygame.error:
                     # If there's an error with the mixer, just reset the speaking state
@@ -1647,41 +1880,51 @@ class EdgeTTSApp(ctk.CTk):
 
     def on_pause_resume(self):
         """Handle pause/resume button click"""
-        if not pygame.mixer.get_init():
+        if not self.audio.is_ready:
             return
             
         if self.is_paused:
-            pygame.mixer.music.unpause()
+            self.audio.resume()
             self.pause_button.configure(text=f"{ICONS['PAUSE']} Pause")
             self.is_paused = False
             self.update_detailed_status("Playback resumed.")
+            if self.update_progress_id is None:
+                self.update_progress()
         else:
-            pygame.mixer.music.pause()
+            self.audio.pause()
             self.pause_button.configure(text=f"{ICONS['RESUME']} Resume")
             self.is_paused = True
             self.update_detailed_status("Playback paused.")
 
     def on_volume_change(self, value):
         """Handle volume slider change"""
-        if pygame.mixer.get_init():
-            pygame.mixer.music.set_volume(float(value) / 100)
+        self.audio.set_volume(float(value) / 100)
 
     def on_progress_click(self, event):
         """Handle click on progress bar for seeking"""
-        if pygame.mixer.music.get_busy():
-            # Calculate relative position
-            width = self.progress_bar.winfo_width()
-            relative_pos = event.x / width
-            # Set position
-            pygame.mixer.music.set_pos(relative_pos * self.audio_length)
-            # Update display
-            self.progress_bar.set(relative_pos)
-            self.current_time.configure(text=self.format_time(relative_pos * self.audio_length))
+        if not self.audio.is_ready or not (self.audio.is_busy() or self.is_paused):
+            return
+        # Calculate relative position
+        width = self.progress_bar.winfo_width()
+        relative_pos = min(max(event.x / width, 0.0), 1.0)
+        # While streaming, only the part synthesized so far can be reached
+        self.seek_to(min(relative_pos * self.audio_length, self.audio.length))
+
+    def seek_to(self, seconds):
+        """Seek playback to the start of the MP3 frame containing the given time"""
+        try:
+            frame_time = self.audio.seek(seconds, paused=self.is_paused)
+            self.progress_bar.set(frame_time / self.audio_length if self.audio_length > 0 else 0)
+            self.current_time.configure(text=self.format_time(frame_time))
+            self.highlight_current_word(frame_time)
+            logging.debug(f"Seeked to {frame_time:.3f}s")
+        except Exception as e:
+            logging.error(f"Error seeking to {seconds:.2f}s: {e}")
 
     def on_save_as(self):
         if self.is_speaking: return
 
-        text = self.text_input.get("1.0", "end-1c").strip()
+        text = self._editor_text().strip()
         if not text:
             self.update_detailed_status("Error: Text input is empty.")
             return
@@ -1700,35 +1943,142 @@ class EdgeTTSApp(ctk.CTk):
             self.update_detailed_status("Save cancelled. Ready.")
             return
 
+        rate, pitch = format_prosody(self.rate_slider.get(), self.pitch_slider.get())
+        last_synthesis = self._find_last_synthesis(text, selected_voice_short_name, rate, pitch)
+
         self._set_speaking_state(True) # Use speaking state to manage buttons
-        self.update_detailed_status(f"Synthesizing and saving to {os.path.basename(filepath)}...")
+        if last_synthesis:
+            self.update_detailed_status(f"Saving last synthesis to {os.path.basename(filepath)}...")
+        else:
+            self.update_detailed_status(f"Synthesizing and saving to {os.path.basename(filepath)}...")
 
         def synthesis_thread():
             try:
-                success = self._synthesize_speech(text, selected_voice_short_name, filepath)
-                if self.stop_requested.is_set():
-                    self.after(0, self.update_detailed_status, "Save operation stopped.")
+                if last_synthesis:
+                    # Same text and settings as the last synthesis: write its audio instead
+                    try:
+                        self._write_audio_files(last_synthesis['audio_paths'], filepath)
+                        self.after(0, self.update_detailed_status,
+                                   f"Audio saved to {os.path.basename(filepath)} from the last synthesis. Ready.")
+                    except Exception as e:
+                        handle_error(FileOperationError(f"Failed to save audio: {e}"), "File Error", parent=self)
                     return
 
-                if success:
-                    self.after(0, self.update_detailed_status, f"Audio saved to {os.path.basename(filepath)}. Ready.")
+                self._export_speech(text, selected_voice_short_name, filepath, finish=False)
             finally:
                 if not self.stop_requested.is_set():
                     self.after(0, lambda: self._set_speaking_state(False))
 
         threading.Thread(target=synthesis_thread, daemon=True).start()
 
+    def _export_speech(self, text, voice, filepath, journal=None, finish=True):
+        """
+        Synthesize text into filepath through a journaled partial file
+
+        The audio is written to a partial file next to filepath and moved into
+        place once complete. If the export fails part way, the journal is kept
+        and the export is offered for resuming on the next launch. Runs on a
+        worker thread.
+
+        Args:
+            journal: ExportJournal of an interrupted export to resume
+            finish: Whether to leave the speaking state when done
+        """
+        resumed = journal is not None
+        interrupted = False
+        try:
+            if journal is None:
+                journal = ExportJournal(filepath)
+            self._update_pending_exports(add=journal.path)
+            success = self._synthesize_speech(text, voice, journal.partial_path, journal=journal)
+            stopped = self.stop_requested.is_set() or bool(self.synthesis_future and self.synthesis_future.cancelled())
+            if stopped or (not success and not journal.completed):
+                # Nothing worth resuming
+                journal.discard()
+                self._update_pending_exports(remove=journal.path)
+                if stopped:
+                    self.after(0, self.update_detailed_status, "Save operation stopped.")
+                return
+            if not success:
+                interrupted = True
+                self.after(0, self.update_detailed_status,
+                           f"Saving {os.path.basename(filepath)} was interrupted; it can be resumed on the next launch.")
+                return
+
+            try:
+                journal.commit()
+            except Exception as e:
+                handle_error(FileOperationError(f"Failed to save audio: {e}"), "File Error", parent=self)
+                return
+            self._update_pending_exports(remove=journal.path)
+            self._remember_synthesis(text, voice, journal.rate, journal.pitch, [filepath], temporary=False)
+            self.after(0, self.update_detailed_status, f"Audio saved to {os.path.basename(filepath)}. Ready.")
+        finally:
+            if finish and not self.stop_requested.is_set():
+                self.after(0, lambda: self._set_speaking_state(False))
+                if resumed and not interrupted:
+                    # Offer the next interrupted export, if there is one
+                    self.after(0, self.check_pending_exports)
+
+    def _remember_synthesis(self, text, voice, rate, pitch, audio_paths, temporary=True):
+        """Record the result of a completed synthesis, replacing the previous one"""
+        self._forget_last_synthesis()
+        self.last_synthesis = {
+            'text': text,
+            'voice': voice,
+            'rate': rate,
+            'pitch': pitch,
+            'audio_paths': list(audio_paths),
+            'word_timings': list(self.word_timings),
+            'temporary': temporary  # Files are ours to delete
+        }
+
+    def _find_last_synthesis(self, text, voice, rate, pitch):
+        """Return the last synthesis if it was made from the same text and settings"""
+        last = self.last_synthesis
+        if not last or (last['text'], last['voice'], last['rate'], last['pitch']) != (text, voice, rate, pitch):
+            return None
+        if not all(os.path.exists(path) for path in last['audio_paths']):
+            return None
+        return last
+
+    def _forget_last_synthesis(self):
+        """Drop the last synthesis result and delete its temporary files"""
+        last, self.last_synthesis = self.last_synthesis, None
+        if not last or not last['temporary']:
+            return
+        for path in last['audio_paths']:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                logging.warning(f"Failed to remove audio file {path}: {e}")
+
+    def _write_audio_files(self, audio_paths, output_filepath):
+        """Write audio files back to back into output_filepath"""
+        if [os.path.abspath(path) for path in audio_paths] == [os.path.abspath(output_filepath)]:
+            return  # Saving over the file the audio came from
+        temp_path = output_filepath + ".tmp"
+        with open(temp_path, "wb") as output_file:
+            for path in audio_paths:
+                with open(path, "rb") as audio_file:
+                    shutil.copyfileobj(audio_file, output_file)
+        os.replace(temp_path, output_filepath)
+
     def on_stop(self):
         """Handle stop button click"""
         self.update_detailed_status("Stop request received...")
         self.stop_requested.set()
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
-            pygame.mixer.quit()  # Quit mixer after stopping
+        # Cancel the synthesis task so its stream stops and the worker thread is released
+        self.loop_service.cancel(self.synthesis_future)
+        self.audio.stop()
+        # Wake the playback thread right away instead of on its next check
+        self.playback.stop()
         self._set_speaking_state(False)
         self.progress_bar.set(0)
         self.current_time.configure(text="0:00")
-        self.text_input.tag_remove("highlight", "1.0", "end")
+        self._clear_word_highlight()
+        self.current_word_index = -1
         if self.update_progress_id:
             self.after_cancel(self.update_progress_id)
             self.update_progress_id = None
@@ -1748,16 +2098,97 @@ class EdgeTTSApp(ctk.CTk):
             return
 
         try:
+            if os.path.splitext(filepath)[1].lower() in DOCUMENT_EXTENSIONS:
+                self._open_document(filepath)
+                return
             text = self._read_file_content(filepath)
+            self._close_document()
             if text:
-                self.text_input.delete("1.0", "end")
-                self.text_input.insert("1.0", text)
+                self._set_editor_text(text)
                 self.update_detailed_status(f"Loaded text from {os.path.basename(filepath)}")
             else:
                 self.update_detailed_status("Error: Could not read text from file.")
         except Exception as e:
             self.update_detailed_status(f"Error loading file: {str(e)}")
 
+    def _set_editor_text(self, text):
+        """Replace the editor contents, switching to a paged view for very large texts"""
+        if self.text_window_poll_id:
+            self.after_cancel(self.text_window_poll_id)
+            self.text_window_poll_id = None
+        if len(text) > LARGE_DOCUMENT_CHARS:
+            self.text_window.load(text)
+            self.text_window_poll_id = self.after(TEXT_WINDOW_POLL_MS, self._poll_text_window)
+        else:
+            self.text_window.close()
+            self.text_input.delete("1.0", "end")
+            self.text_input.insert("1.0", text)
+        self.update_text_stats(None)
+
+    def _poll_text_window(self):
+        """Page the large document view when it is scrolled close to either end"""
+        try:
+            self.text_window.check_scroll()
+        except Exception as e:
+            logging.error(f"Error paging text window: {e}")
+        self.text_window_poll_id = self.after(TEXT_WINDOW_POLL_MS, self._poll_text_window)
+
+    def _editor_text(self):
+        """The whole text being edited, including the parts of a large document not shown"""
+        if self.text_window.is_active:
+            return self.text_window.text()
+        return self.text_input.get("1.0", "end-1c")
+
+    def _open_document(self, filepath):
+        """Open an EPUB, HTML or Markdown file and show its first chapter"""
+        try:
+            document = open_document(filepath)
+        except Exception as e:
+            raise FileOperationError(f"Error reading document: {e}")
+        self.document = document
+        self.chapter_menu.configure(values=[f"{index + 1}. {title}" for index, title in enumerate(document.titles)])
+        if len(document) > 1:
+            self.chapter_menu.grid(row=1, column=0, columnspan=3, sticky="ew", pady=(5, 0))
+        else:
+            self.chapter_menu.grid_remove()
+        try:
+            index, text = document.first_chapter_with_text()
+        except Exception as e:
+            raise FileOperationError(f"Error reading document: {e}")
+        self._show_chapter(index, text)
+
+    def _close_document(self):
+        """Forget the open chapter document after plain text is loaded"""
+        self.document = None
+        self.chapter_index = 0
+        self.chapter_menu.grid_remove()
+
+    def on_chapter_selected(self, choice):
+        """Load the chosen chapter into the editor"""
+        values = self.chapter_menu.cget("values")
+        if self.is_speaking or not self.document:
+            self.chapter_menu.set(values[self.chapter_index])
+            return
+        self._show_chapter(values.index(choice))
+
+    def _show_chapter(self, index, text=None):
+        """Decode a chapter of the open document, unless its text is given, and put it in the editor"""
+        try:
+            if text is None:
+                text = self.document.read_chapter(index)
+        except Exception as e:
+            self.update_detailed_status(f"Error loading chapter: {e}")
+            return
+        self.chapter_index = index
+        self.chapter_menu.set(self.chapter_menu.cget("values")[index])
+        self._set_editor_text(text)
+        name = os.path.basename(self.document.path)
+        if len(self.document) > 1:
+            title = self.document.chapters[index].title
+            self.update_detailed_status(f"Loaded \"{title}\" ({index + 1}/{len(self.document)}) from {name}")
+        else:
+            self.update_detailed_status(f"Loaded text from {name}")
+
     def _read_file_content(self, filepath):
         """
         Read content from various file types with comprehensive error handling
@@ -1799,20 +2230,13 @@ class EdgeTTSApp(ctk.CTk):
     def _read_text_file(self, filepath):
         """Read content from a text file with encoding detection and error handling"""
         try:
-            # Read file for encoding detection
-            with open(filepath, 'rb') as file:
-                raw_data = file.read()
-                detected = chardet.detect(raw_data)
-                encoding = detected['encoding'] or 'utf-8'
-                logging.debug(f"Detected encoding: {encoding}")
-                
-            # Read file with detected encoding
-            with open(filepath, 'r', encoding=encoding) as file:
-                content = file.read()
-                if not content.strip():
-                    raise FileOperationError("File contains no text content")
-                return content
-                
+            # Encoding is detected from a sample, then the file is decoded in one pass
+            content, encoding = read_text_file(filepath)
+            logging.info(f"Read {len(content)} characters as {encoding}")
+            if not content.strip():
+                raise FileOperationError("File contains no text content")
+            return content
+
         except UnicodeDecodeError as e:
             raise FileOperationError(f"Failed to decode file with detected encoding: {e}")
         except Exception as e:
@@ -1821,8 +2245,8 @@ class EdgeTTSApp(ctk.CTk):
     def _read_docx(self, filepath):
         """Read content from a DOCX file with error handling"""
         try:
-            doc = docx.Document(filepath)
-            content = '\n'.join([paragraph.text for paragraph in doc.paragraphs])
+            # Paragraphs and table cells are streamed from the document XML
+            content = read_docx(filepath)
             if not content.strip():
                 raise FileOperationError("DOCX file contains no text content")
             return content
@@ -1832,22 +2256,28 @@ class EdgeTTSApp(ctk.CTk):
     def _read_rtf(self, filepath):
         """Read content from an RTF file with error handling"""
         try:
-            # For RTF files, we'll use a simple text reading approach
-            content = self._read_text_file(filepath)
+            # Markup, font tables and pictures are dropped so only the text is spoken
+            content = read_rtf(filepath)
             if not content.strip():
                 raise FileOperationError("RTF file contains no text content")
             return content
         except Exception as e:
             raise FileOperationError(f"Error reading RTF file: {e}")
 
-    def _synthesize_speech(self, text, voice_short_name, output_filepath):
+    def _synthesize_speech(self, text, voice_short_name, output_filepath, on_chunk=None, journal=None):
         """
         Synthesize speech with comprehensive error handling and word timing
         
         Args:
             text: Text to synthesize
             voice_short_name: Voice to use
-            output_filepath: Where to save the audio
+            output_filepath: Where to save the audio, or None to only hand
+                chunks to on_chunk
+            on_chunk: Optional callback(index, audio, timings) called from the
+                synthesis thread as each chunk is written, in text order
+            journal: Optional ExportJournal for output_filepath. A new journal
+                records each chunk once it is on disk; a loaded one resumes
+                its export after the last recorded chunk
             
         Returns:
             bool: Whether synthesis was successful
@@ -1873,65 +2303,144 @@ class EdgeTTSApp(ctk.CTk):
             logging.info(f"Starting synthesis with voice: {voice_short_name}")
             logging.debug(f"Text length: {len(text)} characters")
 
-            # Get rate and pitch values
-            rate = self.rate_slider.get()
-            pitch = self.pitch_slider.get()
+            # Get rate and pitch values; a resumed export keeps the ones it started with
+            resuming = journal is not None and bool(journal.chunks)
+            if resuming:
+                rate, pitch = journal.rate, journal.pitch
+            else:
+                rate, pitch = format_prosody(self.rate_slider.get(), self.pitch_slider.get())
 
-            # Rate needs to be a percentage string (e.g., "+0%", "+50%", "-50%")
-            rate_percent = int((rate - 1.0) * 100)  # Convert multiplier to percentage difference
-            
             # Ensure output directory exists
-            output_dir = os.path.dirname(output_filepath)
+            output_dir = os.path.dirname(output_filepath) if output_filepath else None
             if output_dir:
                 os.makedirs(output_dir, exist_ok=True)
 
             # Reset word timings
             self.word_timings = []
-            self.current_word_index = 0
+            self.timing_index = WordTimingIndex()
+            self.current_word_index = -1
+            self.seek_index = Mp3SeekIndex()
+
+            # Split long texts so chunks can be synthesized in parallel. Sentences
+            # with stored audio, from an earlier run or from typing, get chunks of
+            # their own, so only the changed text goes to the network
+            first_index = 0
+            start_time = 0.0
+            if resuming:
+                # Only the chunks after the last one on disk are left
+                first_index = journal.next_index
+                start_time = journal.written_duration
+                chunks = journal.chunks[first_index:]
+                self.word_timings = journal.word_timings()
+                logging.info(f"Resuming export after chunk {first_index}/{len(journal.chunks)}")
+            else:
+                chunks = split_text_into_chunks(
+                    text,
+                    is_cached=lambda sentence: make_cache_key(sentence, voice_short_name, rate, pitch) in self.session_store
+                )
+                if not chunks:
+                    raise ValueError("Text has nothing to speak")
+                # Report what will go to the network, not what changed: evicted
+                # or unsplit audio is synthesized again even if its text is the same
+                uncached, total = self.synthesis_session.uncached_sentences(chunks, voice_short_name, rate, pitch)
+                logging.info(f"{uncached} of {total} sentences need synthesis")
+                if uncached < total:
+                    self.after(0, self.update_detailed_status,
+                               f"Re-synthesizing {uncached} of {total} sentences...")
+                if journal is not None:
+                    journal.start(text, voice_short_name, rate, pitch, chunks)
+            logging.info(f"Split text into {len(chunks)} chunks (concurrency: {self.synthesis_concurrency})")
+
+            def open_output():
+                if journal is not None:
+                    return journal.open_partial()
+                if output_filepath:
+                    return open(output_filepath, "wb")
+                return contextlib.nullcontext()
 
             async def synthesize_with_retry():
                 try:
-                    # Create communicate instance for saving
-                    communicate = edge_tts.Communicate(
-                        text,
+                    logging.info("Starting to collect word timings...")
+
+                    # Write chunks to the output file in text order as they complete
+                    chunk_stream = iter_synthesized_chunks(
+                        chunks,
                         voice_short_name,
-                        rate=f"{rate_percent:+d}%",
-                        pitch=f"{int(pitch):+d}Hz"
+                        rate,
+                        pitch,
+                        concurrency=self.synthesis_concurrency,
+                        cache=self.session_store
                     )
-                    
-                    # Create a list to store metadata events
-                    metadata_list = []
-                    
-                    logging.info("Starting to collect word timings...")
-                    
-                    # Open the output file for writing
-                    with open(output_filepath, "wb") as file:
-                        async for event in communicate.stream():
-                            if event["type"] == "audio":
-                                file.write(event["data"])
-                            elif event["type"] == "WordBoundary":
-                                timing = {
-                                    'text': event["text"],
-                                    'offset': event["offset"],
-                                    'duration': event["duration"],
-                                    'start': event["offset"] / 10000000,  # Convert to seconds
-                                    'end': (event["offset"] + event["duration"]) / 10000000  # Convert to seconds
-                                }
-                                self.word_timings.append(timing)
-                                logging.debug(f"Word timing collected: {timing}")
-                    
+                    elapsed = start_time
+                    try:
+                        with open_output() as file:
+                            async for index, audio, timings in chunk_stream:
+                                if start_time:
+                                    timings = rebase_word_timings(timings, start_time, 0)
+                                if file:
+                                    file.write(audio)
+                                self.seek_index.feed(audio)
+                                self.word_timings.extend(timings)
+                                # Keep each sentence's audio so the next run can splice it in
+                                chunk_offset, chunk_text = chunks[index]
+                                self.synthesis_session.record_chunk(
+                                    chunk_text,
+                                    audio,
+                                    rebase_word_timings(timings, -elapsed, -chunk_offset),
+                                    voice_short_name,
+                                    rate,
+                                    pitch
+                                )
+                                elapsed += estimate_audio_duration(audio)
+                                if journal is not None:
+                                    # Record the chunk only once its audio is on disk
+                                    file.flush()
+                                    os.fsync(file.fileno())
+                                    end = file.tell()
+                                    journal.record(
+                                        first_index + index,
+                                        make_cache_key(chunk_text, voice_short_name, rate, pitch),
+                                        end - len(audio),
+                                        end,
+                                        elapsed,
+                                        timings
+                                    )
+                                logging.debug(f"Chunk {index + 1}/{len(chunks)} written ({len(audio)} bytes)")
+                                if self.stop_requested.is_set():
+                                    break
+                                if on_chunk:
+                                    on_chunk(index, audio, timings)
+                    finally:
+                        # Cancel chunks still in flight if we stopped early
+                        await chunk_stream.aclose()
+                        self.chunk_store.flush()
+
                     logging.info(f"Collected {len(self.word_timings)} word timings")
                     
-                except ConnectionError as e:
+                except asyncio.CancelledError:
+                    # Stop was requested: the stream and its websocket have been closed
+                    self._discard_partial_output(output_filepath)
+                    raise
+                except CONNECTION_ERRORS as e:
+                    # Raised once resuming the dropped stream has failed repeatedly
                     raise NetworkError(f"Network error during synthesis: {e}")
                 except Exception as e:
                     if isinstance(e, NetworkError):
                         raise
                     raise SynthesisError(f"Synthesis failed: {e}")
 
-            # Run synthesis
+            # Run synthesis on the shared event loop
             try:
-                asyncio.run(synthesize_with_retry())
+                self.synthesis_future = self.loop_service.submit(synthesize_with_retry())
+                self.synthesis_future.result()
+            except concurrent.futures.CancelledError:
+                logging.info("Synthesis cancelled.")
+                # The task may still be closing its output file (and the export
+                # journal); removing them before it is done races with its writes
+                if not self.loop_service.wait_finished(self.synthesis_future, CANCEL_WAIT_SECONDS):
+                    logging.warning("Cancelled synthesis is still running; its output may be left behind")
+                self._discard_partial_output(output_filepath)
+                return False
             except Exception as e:
                 # Re-raise with appropriate error type
                 if isinstance(e, NetworkError):
@@ -1942,20 +2451,18 @@ class EdgeTTSApp(ctk.CTk):
                     raise SynthesisError(f"Unexpected error during synthesis: {e}")
 
             # Verify output file
-            if not os.path.exists(output_filepath):
+            if output_filepath is None:
+                if self.seek_index.total_bytes == 0 and not self.stop_requested.is_set():
+                    raise SynthesisError("Synthesis completed but no audio was received")
+            elif not os.path.exists(output_filepath):
                 raise FileOperationError("Synthesis completed but output file not found")
-            if os.path.getsize(output_filepath) == 0:
+            elif os.path.getsize(output_filepath) == 0:
                 raise FileOperationError("Synthesis completed but output file is empty")
 
             if self.stop_requested.is_set():
                 logging.info("Operation stopped after synthesis.")
                 self.after(0, self.update_detailed_status, "Operation stopped after synthesis.")
-                if os.path.exists(output_filepath) and output_filepath.endswith(TEMP_AUDIO_FILENAME):
-                    try:
-                        os.remove(output_filepath)
-                        logging.info("Cleaned up temporary file after stop request")
-                    except Exception as e:
-                        logging.warning(f"Failed to clean up temporary file: {e}")
+                self._discard_partial_output(output_filepath)
                 return False
 
             logging.info("Synthesis completed successfully")
@@ -1977,6 +2484,17 @@ class EdgeTTSApp(ctk.CTk):
             handle_error(e, "Unexpected Error", parent=self)
             return False
 
+    def _discard_partial_output(self, output_filepath):
+        """Remove the temporary audio file left behind by a stopped synthesis"""
+        if not output_filepath or not output_filepath.endswith(TEMP_AUDIO_FILENAME):
+            return
+        try:
+            if os.path.exists(output_filepath):
+                os.remove(output_filepath)
+                logging.info("Cleaned up temporary file after stop request")
+        except Exception as e:
+            logging.warning(f"Failed to clean up temporary file: {e}")
+
     def _set_speaking_state(self, speaking: bool):
         """Set the UI state for speaking/not speaking"""
         self.is_speaking = speaking
@@ -1992,8 +2510,9 @@ class EdgeTTSApp(ctk.CTk):
             self.stop_button.grid(row=0, column=0, sticky="ew", padx=5)
             self.pause_button.grid(row=0, column=1, sticky="ew", padx=5)
             
-            # Disable voice selection
+            # Disable voice and chapter selection
             self.voice_combobox.configure(state="disabled")
+            self.chapter_menu.configure(state="disabled")
         else:
             # Hide stop and pause buttons
             self.stop_button.grid_remove()
@@ -2003,8 +2522,9 @@ class EdgeTTSApp(ctk.CTk):
             self.speak_button.grid(row=0, column=0, sticky="ew", padx=5)
             self.save_button.grid(row=0, column=1, sticky="ew", padx=5)
             
-            # Enable voice selection
+            # Enable voice and chapter selection
             self.voice_combobox.configure(state="normal")
+            self.chapter_menu.configure(state="normal")
             
         self.update_idletasks()
 
@@ -2308,6 +2828,17 @@ class EdgeTTSApp(ctk.CTk):
         )
         self.pitch_preview_btn.grid(row=0, column=3, padx=(10, 0))
 
+        # Type-ahead synthesis toggle
+        self.type_ahead_switch = ctk.CTkSwitch(
+            controls_frame,
+            text="⌨ Synthesize while typing",
+            variable=self.type_ahead_var,
+            command=self.on_type_ahead_toggle,
+            font=("Helvetica", 12)
+        )
+        self.type_ahead_switch.grid(row=6, column=0, columnspan=2, sticky="w", padx=10, pady=(0, 10))
+        ToolTip(self.type_ahead_switch, "Synthesize finished sentences in the background while you type")
+
         # Bind progress bar click for seeking
         self.progress_bar.bind("<Button-1>", self.on_progress_click)
 
@@ -2425,18 +2956,62 @@ class EdgeTTSApp(ctk.CTk):
 
     def update_text_stats(self, event):
         """Update both word and character count labels"""
-        text = self.text_input.get("1.0", "end-1c")
-        char_count = len(text)
-        # Split by whitespace and filter out empty strings
-        word_count = len([word for word in text.split() if word.strip()])
+        if self.text_window.is_active:
+            # Only the shown window is counted again; the rest is known
+            char_count = len(self.text_window)
+            word_count = self.text_window.word_count()
+        else:
+            text = self.text_input.get("1.0", "end-1c")
+            char_count = len(text)
+            # Split by whitespace and filter out empty strings
+            word_count = len([word for word in text.split() if word.strip()])
         
         self.char_count_label.configure(text=f"Characters: {char_count}")
         self.word_count_label.configure(text=f"Words: {word_count}")
 
+    def on_text_modified(self, event=None):
+        """Discard audio synthesized ahead once the text changes"""
+        if self.text_input.edit_modified():
+            self.read_ahead.invalidate()
+            self.text_input.edit_modified(False)
+
+    def on_type_ahead_toggle(self):
+        """Turn type-ahead synthesis on or off and remember the choice"""
+        if not self.type_ahead_var.get():
+            self.type_ahead.cancel()
+        self.save_config()
+
+    def schedule_type_ahead(self, event=None):
+        """Restart the idle timer after which finished sentences are synthesized"""
+        if not self.type_ahead_var.get():
+            return
+        if self.type_ahead_id:
+            self.after_cancel(self.type_ahead_id)
+        self.type_ahead_id = self.after(TYPE_AHEAD_DELAY_MS, self._run_type_ahead)
+
+    def _run_type_ahead(self):
+        """Synthesize the finished sentences of the paragraphs being written"""
+        self.type_ahead_id = None
+        if self.is_speaking or not self.type_ahead_var.get():
+            return
+        voice = self.get_selected_voice_short_name()
+        if not voice:
+            return
+        # Only the text before the cursor; the sentence at the cursor is still being typed
+        _, recent_text = trailing_paragraphs(self.text_input.get("1.0", "insert"), TYPE_AHEAD_PARAGRAPHS)
+        sentences = completed_sentences(recent_text)
+        if sentences:
+            rate, pitch = format_prosody(self.rate_slider.get(), self.pitch_slider.get())
+            self.type_ahead.prefetch(sentences, voice, rate, pitch)
+
     def on_closing(self, event=0):
         """Handle application closing"""
-        if pygame.mixer.get_init():
-            pygame.mixer.quit()
+        if self.text_window_poll_id:
+            self.after_cancel(self.text_window_poll_id)
+        self.loop_service.shutdown()
+        self.synthesis_cache.flush()
+        self.audio.shutdown()
+        self._forget_last_synthesis()
         self.quit()
 
     def _set_app_icon(self):
@@ -2460,23 +3035,19 @@ class EdgeTTSApp(ctk.CTk):
     def on_rate_change(self, value):
         """Handle rate slider change"""
         self.rate_value_label.configure(text=f"{value:.1f}×")
+        self.read_ahead.invalidate()
 
     def on_pitch_change(self, value):
         """Handle pitch slider change"""
         self.pitch_value_label.configure(text=f"±{int(value)} Hz")
+        self.read_ahead.invalidate()
 
     def preview_settings(self, setting_type):
-        """Preview rate or pitch settings with a short sample."""
+        """Preview rate or pitch settings with a short sample without blocking the UI."""
         if self.is_speaking and not self.is_paused:
             return  # Don't preview while speaking
-
-        # Store current main playback state
-        was_playing = False
-        current_pos = 0
-        if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
-            was_playing = True
-            current_pos = pygame.mixer.music.get_pos() / 1000.0
-            pygame.mixer.music.pause()
+        if self.preview_future or self.preview_playback.is_active:
+            return  # A preview is already being synthesized or played
 
         # Get the selected voice and determine language
         selected_voice = self.get_selected_voice_short_name()
@@ -2503,71 +3074,49 @@ class EdgeTTSApp(ctk.CTk):
         # Create temporary file for preview
         preview_file = os.path.join(tempfile.gettempdir(), "preview_audio_edge_tts.mp3")
 
-        # Synthesize and play preview
-        if selected_voice:
-            try:
-                # Get current settings
-                rate = self.rate_slider.get()
-                pitch = self.pitch_slider.get()
-
-                # Convert rate to percentage
-                rate_percent = int((rate - 1.0) * 100)
-
-                # Create communicate instance for preview
-                communicate = edge_tts.Communicate(
-                    preview_text,
-                    selected_voice,
-                    rate=f"{rate_percent:+d}%",
-                    pitch=f"{int(pitch):+d}Hz"
-                )
+        # Get current settings
+        rate, pitch = format_prosody(self.rate_slider.get(), self.pitch_slider.get())
 
-                # Save and play preview with retry
-                async def preview_with_retry():
-                    await retry_async_operation(communicate.save, preview_file)
+        async def synthesize_preview():
+            # Repeated clicks join the stream in flight or hit the chunk store
+            audio, _ = await fetch_chunk(preview_text, selected_voice, rate, pitch, self.chunk_store)
+            with open(preview_file, "wb") as f:
+                f.write(audio)
 
-                asyncio.run(preview_with_retry())
-                
-                # Initialize mixer for preview if needed
-                if pygame.mixer.get_init():
-                    pygame.mixer.quit()
-                pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
-                pygame.mixer.music.load(preview_file)
-                pygame.mixer.music.set_volume(self.volume_slider.get() / 100)
-                pygame.mixer.music.play()
-
-                # Wait for preview to finish
-                while pygame.mixer.get_init() and pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
-
-                # Clean up preview file
-                pygame.mixer.quit()
+        # Synthesize on the event loop and play from the completion callback
+        self.preview_future = self.loop_service.submit(synthesize_preview())
+        self.preview_future.add_done_callback(
+            lambda future: self.after(0, self._play_preview, future, preview_file)
+        )
+
+    def _play_preview(self, future, preview_file):
+        """Play a synthesized preview on its own channel, leaving main playback untouched"""
+        self.preview_future = None
+        try:
+            future.result()
+            duration = self.audio.play_preview(preview_file)
+            self.preview_playback.begin()
+            # Check once at the expected end instead of polling the mixer
+            self.after(int(duration * 1000), self._check_preview_finished)
+        except Exception as e:
+            self.update_detailed_status(f"Preview error: {e}")
+        finally:
+            # The clip is decoded into memory, so the file is no longer needed
+            try:
                 if os.path.exists(preview_file):
                     os.remove(preview_file)
-
-                # Resume main playback if it was playing
-                if was_playing and self.current_audio_file:
-                    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
-                    pygame.mixer.music.load(self.current_audio_file)
-                    pygame.mixer.music.set_volume(self.volume_slider.get() / 100)
-                    pygame.mixer.music.play()
-                    # Try to restore position
-                    try:
-                        pygame.mixer.music.set_pos(current_pos)
-                    except:
-                        pass  # Position restoration failed, continue from start
-
             except Exception as e:
-                self.update_detailed_status(f"Preview error: {e}")
-                if was_playing:
-                    # Attempt to resume main playback on error
-                    try:
-                        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=2048)
-                        pygame.mixer.music.load(self.current_audio_file)
-                        pygame.mixer.music.set_volume(self.volume_slider.get() / 100)
-                        pygame.mixer.music.play()
-                        pygame.mixer.music.set_pos(current_pos)
-                    except:
-                        pass
+                logging.warning(f"Failed to remove preview file: {e}")
+
+    def _check_preview_finished(self):
+        """Finish the preview once the channel has drained"""
+        if not self.preview_playback.is_active:
+            return
+        if self.audio.is_preview_busy():
+            # The device still holds the tail of the audio
+            self.after(20, self._check_preview_finished)
+            return
+        self.preview_playback.finish()
 
     def handle_space_key(self, event=None):
         """Handle space key press for play/pause functionality"""
@@ -2576,7 +3125,7 @@ class EdgeTTSApp(ctk.CTk):
             return
             
         if self.is_speaking:
-            if pygame.mixer.get_init() and pygame.mixer.music.get_busy():
+            if self.audio.is_busy() or self.is_paused:
                 self.on_pause_resume()
         else:
             self.on_speak()
@@ -2626,9 +3175,7 @@ class EdgeTTSApp(ctk.CTk):
         """Update text input with appropriate default text for the language"""
         lang_code = self.get_language_code_from_voice(voice_name)
         default_text = DEFAULT_TEXTS.get(lang_code, DEFAULT_TEXTS["en"])  # Fallback to English if language not found
-        self.text_input.delete("1.0", "end")
-        self.text_input.insert("1.0", default_text)
-        self.update_text_stats(None)  # Update word/character count
+        self._set_editor_text(default_text)
 
 if __name__ == "__main__":
     app = EdgeTTSApp()
@@ -0,0 +1,256 @@
+import io
+import logging
+from array import array
+from bisect import bisect_right
+
+import pygame
+
+from utils.mp3 import Mp3SeekIndex
+
+MIXER_FREQUENCY = 44100  # Output sample rate of the audio device
+MIXER_BUFFER = 2048  # Device buffer size in samples
+PREVIEW_CHANNEL = 0  # Mixer channel reserved for previews
+
+class _FileTail(io.RawIOBase):
+    """Read-only view of a file from a byte offset on, which looks like a whole file to its reader"""
+
+    def __init__(self, path, start):
+        super().__init__()
+        self._file = open(path, 'rb')
+        self._start = start
+        self._file.seek(start)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._file.readinto(buffer)
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = max(pos, 0) + self._start
+        return self._file.seek(pos, whence) - self._start
+
+    def tell(self):
+        return self._file.tell() - self._start
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+class AudioEngine:
+    """
+    Long-lived owner of the audio output device
+
+    The mixer is opened once and kept open, so starting playback only loads
+    a track. Main playback is a sequence of segments streamed through
+    pygame.mixer.music, each queued before the previous one ends so they play
+    back to back. Previews play as Sounds on a reserved channel without
+    interrupting it.
+    """
+
+    def __init__(self, frequency=MIXER_FREQUENCY, buffer=MIXER_BUFFER):
+        self.frequency = frequency
+        self.buffer = buffer
+        self.volume = 1.0
+        self.offset = 0.0  # Timeline position at which the current track's clock starts
+        self.is_paused = False
+
+        # Segments of the main playback sequence
+        self.segments = []  # (path, start_time, duration)
+        self.segment_starts = array('d')
+        self.segment_frames = []  # Mp3SeekIndex of each segment, built when first needed
+        self.sequence_complete = True  # No more segments will be added
+        self.current_segment = -1  # Segment being played, -1 before playback starts
+        self.queued_segment = -1  # Last segment handed to the mixer
+        self._last_track_pos = 0.0
+        self.preview_channel = None
+        self.preview_sound = None
+
+    @property
+    def is_ready(self):
+        return pygame.mixer.get_init() is not None
+
+    def start(self):
+        """Open the audio device if it is not open yet"""
+        if self.is_ready:
+            return
+        pygame.mixer.init(frequency=self.frequency, size=-16, channels=2, buffer=self.buffer)
+        # Keep the preview channel out of the pool used by other Sounds
+        pygame.mixer.set_reserved(PREVIEW_CHANNEL + 1)
+        self.preview_channel = pygame.mixer.Channel(PREVIEW_CHANNEL)
+        self.preview_channel.set_volume(self.volume)
+        logging.info("Audio device opened")
+
+    @property
+    def length(self):
+        """Duration of the segments added to the sequence so far"""
+        if not self.segments:
+            return 0.0
+        _, start, duration = self.segments[-1]
+        return start + duration
+
+    def new_sequence(self):
+        """Stop playback and start an empty sequence that segments can be added to"""
+        self.stop()
+        self.segments = []
+        self.segment_starts = array('d')
+        self.segment_frames = []
+        self.sequence_complete = False
+        self.current_segment = -1
+        self.queued_segment = -1
+        self.offset = 0.0
+
+    def add_segment(self, path, duration, frames=None):
+        """Append an audio file to the end of the sequence, with its Mp3SeekIndex if there is one"""
+        start = self.length
+        self.segments.append((path, start, duration))
+        self.segment_starts.append(start)
+        self.segment_frames.append(frames)
+
+    def end_sequence(self):
+        """Mark the sequence as complete, so playback finishes after its last segment"""
+        self.sequence_complete = True
+
+    def play_file(self, path, duration, frames=None):
+        """Play a single audio file as a complete sequence"""
+        self.new_sequence()
+        self.add_segment(path, duration, frames)
+        self.end_sequence()
+        self.seek(0.0)
+
+    def seek(self, seconds, paused=False):
+        """
+        Play the sequence from the start of the MP3 frame containing the given time
+
+        The track is opened at the frame's byte offset, so the position is
+        exact and does not depend on how the decoder skips ahead.
+
+        Returns:
+            float: Timeline position playback starts from
+        """
+        if not self.segments:
+            return 0.0
+        index = max(bisect_right(self.segment_starts, seconds) - 1, 0)
+        path, start, _ = self.segments[index]
+        frames = self.segment_frames[index]
+        if frames is None or not len(frames):
+            frames = self.segment_frames[index] = Mp3SeekIndex.from_file(path)
+        frame_time, byte_offset = frames.seek(seconds - start)
+        # The first frame plays from the top of the file, ID3 tag and all
+        self._play_track(path, byte_offset if frame_time > 0 else 0, start + frame_time, paused)
+        self.current_segment = self.queued_segment = index
+        return start + frame_time
+
+    def _play_track(self, path, byte_offset=0, offset=0.0, paused=False):
+        """Load a track and play it from byte_offset, which sits at offset on the timeline"""
+        self.start()
+        if byte_offset:
+            pygame.mixer.music.load(_FileTail(path, byte_offset), "mp3")
+        else:
+            pygame.mixer.music.load(path)
+        pygame.mixer.music.set_volume(self.volume)
+        pygame.mixer.music.play()
+        self.is_paused = paused
+        if paused:
+            pygame.mixer.music.pause()
+        self.offset = offset
+        self._last_track_pos = 0.0
+
+    def update(self):
+        """
+        Advance through the sequence; call regularly while it plays
+
+        Queues the next segment as soon as it is available, so the mixer
+        moves on without a gap, and restarts playback if it ran dry while
+        waiting for a segment to be added.
+
+        Returns:
+            bool: False once the last segment of a complete sequence has finished
+        """
+        if self.is_paused:
+            return True
+        if not self.segments:
+            return not self.sequence_complete
+        if self.is_busy():
+            pos = self.track_position()
+            # get_pos restarts from zero when a queued segment starts playing
+            if self.queued_segment > self.current_segment and pos < self._last_track_pos - 0.1:
+                self.current_segment = self.queued_segment
+                self.offset = self.segments[self.current_segment][1]
+            self._last_track_pos = pos
+            next_index = self.current_segment + 1
+            if self.queued_segment < next_index < len(self.segments):
+                pygame.mixer.music.queue(self.segments[next_index][0])
+                self.queued_segment = next_index
+            return True
+
+        # The mixer ran dry, so everything loaded so far has played
+        next_index = self.queued_segment + 1
+        if next_index < len(self.segments):
+            path, start, _ = self.segments[next_index]
+            self._play_track(path, offset=start)
+            self.current_segment = self.queued_segment = next_index
+            return True
+        return not self.sequence_complete
+
+    def pause(self):
+        if self.is_ready:
+            pygame.mixer.music.pause()
+            self.is_paused = True
+
+    def resume(self):
+        if self.is_ready:
+            pygame.mixer.music.unpause()
+        self.is_paused = False
+
+    def stop(self):
+        """Stop main playback and release the loaded file"""
+        self.is_paused = False
+        if self.is_ready:
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload()
+
+    def is_busy(self):
+        return self.is_ready and pygame.mixer.music.get_busy()
+
+    def track_position(self):
+        """Seconds played since the current track started"""
+        if not self.is_ready:
+            return 0.0
+        return max(pygame.mixer.music.get_pos(), 0) / 1000.0
+
+    def position(self):
+        """Absolute playback position on the timeline, in seconds"""
+        return self.offset + self.track_position()
+
+    def set_volume(self, volume):
+        """Set the volume of main playback and previews (0.0 to 1.0)"""
+        self.volume = volume
+        if self.is_ready:
+            pygame.mixer.music.set_volume(volume)
+            self.preview_channel.set_volume(volume)
+
+    def play_preview(self, path):
+        """
+        Play a short clip on the preview channel
+
+        Returns:
+            float: Length of the clip in seconds
+        """
+        self.start()
+        self.preview_sound = pygame.mixer.Sound(path)
+        self.preview_channel.play(self.preview_sound)
+        return self.preview_sound.get_length()
+
+    def is_preview_busy(self):
+        return self.is_ready and self.preview_channel.get_busy()
+
+    def shutdown(self):
+        """Close the audio device"""
+        if self.is_ready:
+            pygame.mixer.music.stop()
+            pygame.mixer.quit()
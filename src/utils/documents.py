@@ -0,0 +1,411 @@
+import io
+import logging
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from urllib.parse import unquote
+
+from utils.text_loader import detect_encoding
+
+READ_BLOCK_CHARS = 64 * 1024  # Markup fed to the HTML parser at a time
+CHAPTER_HEADING_LEVELS = 2  # Headings up to this level start a new chapter in HTML and Markdown
+HTML_EXTENSIONS = ('.html', '.htm', '.xhtml')
+MARKDOWN_EXTENSIONS = ('.md', '.markdown')
+DOCUMENT_EXTENSIONS = ('.epub',) + HTML_EXTENSIONS + MARKDOWN_EXTENSIONS
+
+# Tags whose start or end breaks the line
+_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'caption', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul',
+))
+# Tags whose content is not read
+_SKIPPED_TAGS = frozenset(('head', 'script', 'style', 'svg', 'math', 'rt', 'rp', 'template', 'noscript'))
+# Table cells are separated like tab-separated columns
+_CELL_TAGS = frozenset(('td', 'th'))
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'wbr'))
+
+_WHITESPACE = re.compile(r'[ \t\r\n\f]+')
+_BLANK_LINES = re.compile(r'\n[ \t]*(?:\n[ \t]*)+')
+# Headings, and the comments and raw text elements in which a heading tag is not markup
+_HTML_HEADING = re.compile(rb'<h([1-6])[\s>]|<!--|-->|<(/?)(script|style)[\s>/]', re.IGNORECASE)
+_HTML_HEADING_TEXT = re.compile(rb'<h([1-6])[^>]*>(.*?)</h\1\s*>', re.IGNORECASE | re.DOTALL)
+_TAG = re.compile(r'<[^>]*>')
+
+_CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+_OPF_NS = '{http://www.idpf.org/2007/opf}'
+_NCX_NS = '{http://www.daisy.org/z3986/2005/ncx/}'
+_XHTML_NS = '{http://www.w3.org/1999/xhtml}'
+_EPUB_NS = '{http://www.idpf.org/2007/ops}'
+
+class _TextExtractor(HTMLParser):
+    """Collect the readable text of HTML fed to it in pieces"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+        self.pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == 'pre':
+            self.pre_depth += 1
+        if tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in _CELL_TAGS:
+            self.parts.append('\t')
+        elif tag == 'img' and not self.skip_depth:
+            alt = dict(attrs).get('alt')
+            if alt:
+                self.parts.append(f' {alt} ')
+
+    def handle_startendtag(self, tag, attrs):
+        # <br/> and friends never get an end tag
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in _SKIPPED_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag == 'pre':
+            self.pre_depth = max(self.pre_depth - 1, 0)
+        if tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        self.parts.append(data if self.pre_depth else _WHITESPACE.sub(' ', data))
+
+    def text(self):
+        self.close()
+        return tidy_text(''.join(self.parts))
+
+def tidy_text(text):
+    """Strip the lines of extracted text and keep at most one blank line between paragraphs"""
+    lines = '\n'.join(line.strip() for line in text.split('\n'))
+    return _BLANK_LINES.sub('\n\n', lines).strip()
+
+def html_to_text(stream):
+    """Extract the readable text of HTML read from a text stream"""
+    extractor = _TextExtractor()
+    for block in iter(lambda: stream.read(READ_BLOCK_CHARS), ''):
+        extractor.feed(block)
+    return extractor.text()
+
+def _strip_tags(markup):
+    return _WHITESPACE.sub(' ', _TAG.sub('', markup)).strip()
+
+# Markdown syntax, applied line by line
+_MD_FENCE = re.compile(r'^\s*(```|~~~)')
+_MD_HEADING = re.compile(r'^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$')
+_MD_RULE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+_MD_LINK_DEFINITION = re.compile(r'^\s{0,3}\[[^\]]+\]:\s*\S+')
+_MD_BLOCK_PREFIX = re.compile(r'^\s*(?:>\s?)*(?:[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)?')
+_MD_IMAGE = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+_MD_LINK = re.compile(r'\[([^\]]+)\](?:\([^)]*\)|\[[^\]]*\])')
+_MD_AUTOLINK = re.compile(r'<((?:https?|mailto):[^>]+)>')
+_MD_CODE = re.compile(r'`+([^`]*)`+')
+_MD_EMPHASIS = re.compile(r'(\*{1,3}|~~)(?=\S)(.+?)(?<=\S)\1')
+# Underscores only mark emphasis outside words, so my_var_name keeps them
+_MD_UNDERSCORE_EMPHASIS = re.compile(r'(?<!\w)(_{1,3})(?=\S)(.+?)(?<=\S)\1(?!\w)')
+_MD_TABLE_RULE = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+
+def _table_row(line):
+    """Cells of a Markdown table row, separated like tab-separated columns"""
+    return '\t'.join(cell.strip() for cell in line.strip().strip('|').split('|'))
+
+def markdown_to_text(lines):
+    """Strip Markdown syntax from an iterable of lines, keeping the readable text"""
+    out = []
+    in_fence = False
+    in_table = False  # After a |---| separator row, until a line without a pipe
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if _MD_FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            out.append(line)
+            continue
+        if _MD_TABLE_RULE.match(line):
+            if '|' in line and out and '|' in out[-1]:
+                # The line before the separator is the header row
+                in_table = True
+                out[-1] = _table_row(out[-1])
+            continue
+        in_table = in_table and '|' in line
+        if _MD_RULE.match(line) or _MD_LINK_DEFINITION.match(line):
+            out.append('')
+            continue
+        heading = _MD_HEADING.match(line)
+        if heading:
+            # Headings stand as paragraphs of their own
+            out.extend(('', heading.group(2), ''))
+            continue
+        line = _MD_BLOCK_PREFIX.sub('', line, count=1)
+        line = _MD_IMAGE.sub(r'\1', line)
+        line = _MD_LINK.sub(r'\1', line)
+        line = _MD_AUTOLINK.sub(r'\1', line)
+        line = _MD_CODE.sub(r'\1', line)
+        line = _MD_EMPHASIS.sub(r'\2', line)
+        line = _MD_UNDERSCORE_EMPHASIS.sub(r'\2', line)
+        line = _TAG.sub('', line)
+        if in_table:
+            line = _table_row(line)
+        out.append(line)
+    return tidy_text('\n'.join(out))
+
+class Chapter:
+    """A chapter of a document, read only when asked for"""
+
+    def __init__(self, title, load):
+        self.title = title
+        self._load = load
+
+    def read(self):
+        """
+        Decode and convert the chapter
+
+        Returns:
+            str: The plain text of the chapter
+        """
+        return self._load()
+
+class Document:
+    """
+    A document split into chapters
+
+    Opening a document only reads its table of contents or scans for
+    headings; the text of a chapter is decoded when it is read, so memory
+    stays proportional to the chapter on screen.
+    """
+
+    def __init__(self, path, title, chapters):
+        self.path = path
+        self.title = title
+        self.chapters = chapters
+
+    def __len__(self):
+        return len(self.chapters)
+
+    @property
+    def titles(self):
+        return [chapter.title for chapter in self.chapters]
+
+    def read_chapter(self, index):
+        return self.chapters[index].read()
+
+    def first_chapter_with_text(self):
+        """
+        Find the first chapter that is not empty, such as the one after a cover page
+
+        Returns:
+            tuple: (index, text), or the first chapter if all of them are empty
+        """
+        first = None
+        for index in range(len(self.chapters)):
+            text = self.read_chapter(index)
+            if text.strip():
+                return index, text
+            if first is None:
+                first = (index, text)
+        return first
+
+def open_document(filepath):
+    """
+    Open an EPUB, HTML or Markdown file as a Document
+
+    Raises:
+        ValueError: If the file type is not supported or the file is malformed
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == '.epub':
+        document = _open_epub(filepath)
+    elif ext in HTML_EXTENSIONS:
+        document = _open_sectioned(filepath, _scan_html_headings, _read_html_range)
+    elif ext in MARKDOWN_EXTENSIONS:
+        document = _open_sectioned(filepath, _scan_markdown_headings, _read_markdown_range)
+    else:
+        raise ValueError(f"Unsupported document type: {ext}")
+    logging.info(f"Opened {filepath} with {len(document)} chapters")
+    return document
+
+# HTML and Markdown: chapters are byte ranges between top-level headings
+
+def _open_sectioned(filepath, scan, read_range):
+    """Split a single-file document at its headings into lazily read chapters"""
+    encoding = detect_encoding(filepath)
+    size = os.path.getsize(filepath)
+    # Byte offsets only line up with characters in encodings that keep ASCII as is
+    headings = [] if encoding.startswith(('utf-16', 'utf-32')) else scan(filepath, encoding)
+    starts = [offset for offset, _ in headings]
+    titles = [title for _, title in headings]
+    if not starts or (starts[0] > 0 and read_range(filepath, encoding, 0, starts[0]).strip()):
+        # Text before the first heading is a chapter of its own
+        starts.insert(0, 0)
+        titles.insert(0, None)
+    else:
+        # Only markup before the first heading, such as <head>: fold it into the first chapter
+        starts[0] = 0
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    chapters = []
+    for index, (start, end) in enumerate(zip(starts, starts[1:] + [size])):
+        title = titles[index] or (name if index == 0 else f"Section {index + 1}")
+        chapters.append(Chapter(title, lambda start=start, end=end: read_range(filepath, encoding, start, end)))
+    return Document(filepath, name, chapters)
+
+def _read_bytes(filepath, start, end):
+    with open(filepath, 'rb') as file:
+        file.seek(start)
+        return file.read(end - start)
+
+def _scan_html_headings(filepath, encoding):
+    """Byte offsets and titles of the chapter headings of an HTML file"""
+    headings = []
+    offset = 0
+    in_comment = False
+    raw_element = None  # b'script' or b'style' while inside one
+    with open(filepath, 'rb') as file:
+        for line in file:
+            for match in _HTML_HEADING.finditer(line):
+                token = match.group(0)
+                if in_comment:
+                    in_comment = token != b'-->'
+                elif raw_element:
+                    if match.group(2) and match.group(3).lower() == raw_element:
+                        raw_element = None
+                elif token == b'<!--':
+                    in_comment = True
+                elif match.group(3):
+                    if not match.group(2):
+                        raw_element = match.group(3).lower()
+                elif match.group(1) and int(match.group(1)) <= CHAPTER_HEADING_LEVELS:
+                    title = _HTML_HEADING_TEXT.match(line, match.start())
+                    text = _strip_tags(title.group(2).decode(encoding, errors='replace')) if title else ''
+                    headings.append((offset + match.start(), text or None))
+            offset += len(line)
+    return headings
+
+def _read_html_range(filepath, encoding, start, end):
+    data = _read_bytes(filepath, start, end)
+    return html_to_text(io.StringIO(data.decode(encoding, errors='replace')))
+
+def _scan_markdown_headings(filepath, encoding):
+    """Byte offsets and titles of the chapter headings of a Markdown file"""
+    headings = []
+    offset = 0
+    in_fence = False
+    with open(filepath, 'rb') as file:
+        for raw in file:
+            line = raw.decode(encoding, errors='replace')
+            if _MD_FENCE.match(line):
+                in_fence = not in_fence
+            elif not in_fence:
+                heading = _MD_HEADING.match(line.rstrip('\r\n'))
+                if heading and len(heading.group(1)) <= CHAPTER_HEADING_LEVELS:
+                    headings.append((offset, _strip_tags(heading.group(2)) or None))
+            offset += len(raw)
+    return headings
+
+def _read_markdown_range(filepath, encoding, start, end):
+    data = _read_bytes(filepath, start, end)
+    return markdown_to_text(io.StringIO(data.decode(encoding, errors='replace')))
+
+# EPUB: chapters are the XHTML documents of the spine, in reading order
+
+def _open_epub(filepath):
+    with zipfile.ZipFile(filepath) as archive:
+        container = ET.fromstring(archive.read('META-INF/container.xml'))
+        rootfile = container.find(f'.//{_CONTAINER_NS}rootfile')
+        if rootfile is None:
+            raise ValueError("EPUB has no package document")
+        opf_path = rootfile.get('full-path')
+        package = ET.fromstring(archive.read(opf_path))
+        base = posixpath.dirname(opf_path)
+
+        manifest = {}
+        nav_path = None
+        for item in package.iter(f'{_OPF_NS}item'):
+            path = posixpath.normpath(posixpath.join(base, unquote(item.get('href', ''))))
+            manifest[item.get('id')] = (path, item.get('media-type'))
+            if 'nav' in (item.get('properties') or '').split():
+                nav_path = path
+
+        spine = package.find(f'{_OPF_NS}spine')
+        if spine is None:
+            raise ValueError("EPUB has no spine")
+        toc_titles = {}
+        if nav_path:
+            toc_titles = _read_nav_titles(archive, nav_path)
+        elif spine.get('toc') in manifest:
+            toc_titles = _read_ncx_titles(archive, manifest[spine.get('toc')][0])
+
+        title_elem = package.find('.//{http://purl.org/dc/elements/1.1/}title')
+        title = (title_elem.text or '').strip() if title_elem is not None else ''
+
+    chapters = []
+    for itemref in spine.iter(f'{_OPF_NS}itemref'):
+        path, media_type = manifest.get(itemref.get('idref'), (None, None))
+        if not path or media_type not in ('application/xhtml+xml', 'text/html'):
+            continue
+        chapter_title = toc_titles.get(path) or f"Chapter {len(chapters) + 1}"
+        chapters.append(Chapter(chapter_title, lambda path=path: _read_epub_chapter(filepath, path)))
+    if not chapters:
+        raise ValueError("EPUB has no readable chapters")
+    return Document(filepath, title or os.path.splitext(os.path.basename(filepath))[0], chapters)
+
+def _read_epub_chapter(filepath, path):
+    with zipfile.ZipFile(filepath) as archive:
+        with archive.open(path) as member:
+            return html_to_text(io.TextIOWrapper(member, encoding='utf-8-sig', errors='replace'))
+
+def _toc_target(base, href):
+    """Resolve a table of contents link to the archive path of its document"""
+    href = unquote(href.split('#', 1)[0])
+    return posixpath.normpath(posixpath.join(base, href)) if href else None
+
+def _read_nav_titles(archive, nav_path):
+    """Chapter titles from an EPUB 3 navigation document, keyed by document path"""
+    titles = {}
+    try:
+        nav_doc = ET.fromstring(archive.read(nav_path))
+    except (KeyError, ET.ParseError) as e:
+        logging.warning(f"Unreadable EPUB navigation document: {e}")
+        return titles
+    base = posixpath.dirname(nav_path)
+    for nav in nav_doc.iter(f'{_XHTML_NS}nav'):
+        if nav.get(f'{_EPUB_NS}type') not in (None, 'toc'):
+            continue
+        for link in nav.iter(f'{_XHTML_NS}a'):
+            target = _toc_target(base, link.get('href', ''))
+            text = _WHITESPACE.sub(' ', ''.join(link.itertext())).strip()
+            if target and text:
+                titles.setdefault(target, text)
+    return titles
+
+def _read_ncx_titles(archive, ncx_path):
+    """Chapter titles from an EPUB 2 NCX table of contents, keyed by document path"""
+    titles = {}
+    try:
+        ncx = ET.fromstring(archive.read(ncx_path))
+    except (KeyError, ET.ParseError) as e:
+        logging.warning(f"Unreadable EPUB table of contents: {e}")
+        return titles
+    base = posixpath.dirname(ncx_path)
+    for point in ncx.iter(f'{_NCX_NS}navPoint'):
+        label = point.find(f'{_NCX_NS}navLabel/{_NCX_NS}text')
+        content = point.find(f'{_NCX_NS}content')
+        if label is None or content is None:
+            continue
+        target = _toc_target(base, content.get('src', ''))
+        text = (label.text or '').strip()
+        if target and text:
+            titles.setdefault(target, text)
+    return titles
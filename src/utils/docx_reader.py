@@ -0,0 +1,97 @@
+import logging
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+DOCUMENT_PART = 'word/document.xml'
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Word stores text boxes twice, as DrawingML in mc:Choice and as VML in mc:Fallback
+_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+# Paragraph styles that mark structure, e.g. "Title", "Heading1", "heading 2"
+_HEADING_STYLE = re.compile(r'^(?:title|heading\s*(\d))$', re.IGNORECASE)
+
+def _heading_level(style):
+    """Outline level of a paragraph style, or None if it is not a heading"""
+    match = _HEADING_STYLE.match(style or '')
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else 0
+
+def iter_docx_paragraphs(filepath):
+    """
+    Stream the paragraphs of a DOCX file
+
+    word/document.xml is read straight from the zip with an incremental
+    parser, and each paragraph is dropped from the tree once it has been
+    yielded, so memory stays bounded however long the document is. Table
+    cells are yielded as paragraphs of their own; empty ones are skipped.
+    Only the first copy of content stored in mc:AlternateContent is read.
+
+    Yields:
+        tuple: (text, heading_level) with heading_level 0 for a title, 1-9
+        for headings and None for body text
+    """
+    with zipfile.ZipFile(filepath) as archive:
+        with archive.open(DOCUMENT_PART) as document:
+            body = None
+            # [text parts, style] of the paragraphs being parsed; text boxes nest them
+            paragraphs = []
+            table_depth = 0
+            fallback_depth = 0
+            for event, elem in ET.iterparse(document, events=('start', 'end')):
+                tag = elem.tag
+                if tag == _FALLBACK:
+                    fallback_depth += 1 if event == 'start' else -1
+                    continue
+                if fallback_depth:
+                    continue
+                if event == 'start':
+                    if tag == _W + 'body':
+                        body = elem
+                    elif tag == _W + 'tbl':
+                        table_depth += 1
+                    elif tag == _W + 'p':
+                        paragraphs.append([[], None])
+                    continue
+
+                if tag == _W + 'p':
+                    parts, style = paragraphs.pop()
+                    text = ''.join(parts)
+                    if not (table_depth and not text.strip()):
+                        yield text, _heading_level(style)
+                    elem.clear()
+                elif paragraphs:
+                    parts = paragraphs[-1][0]
+                    if tag == _W + 't':
+                        parts.append(elem.text or '')
+                    elif tag == _W + 'tab' and elem.get(_W + 'pos') is None:  # Not a tab stop definition
+                        parts.append('\t')
+                    elif tag in (_W + 'br', _W + 'cr'):
+                        parts.append('\n')
+                    elif tag == _W + 'noBreakHyphen':
+                        parts.append('-')
+                    elif tag == _W + 'pStyle':
+                        paragraphs[-1][1] = elem.get(_W + 'val')
+                if tag == _W + 'tbl':
+                    table_depth -= 1
+
+                # Drop finished top-level blocks so the tree does not grow
+                if body is not None and tag in (_W + 'p', _W + 'tbl', _W + 'sdt') and len(body) and body[-1] is elem:
+                    body.clear()
+
+def read_docx(filepath):
+    """
+    Read the text of a DOCX file, one paragraph per line
+
+    Returns:
+        str: The document text
+    """
+    paragraphs = []
+    headings = 0
+    for text, level in iter_docx_paragraphs(filepath):
+        paragraphs.append(text)
+        if level is not None:
+            headings += 1
+    logging.info(f"Read {len(paragraphs)} paragraphs ({headings} headings) from DOCX")
+    return '\n'.join(paragraphs)
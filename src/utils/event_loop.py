@@ -0,0 +1,138 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+
+class AsyncLoopService:
+    """
+    Own a single long-lived asyncio event loop running in a background thread
+
+    Coroutines are submitted from any thread and return concurrent futures,
+    so callers can wait on results, attach callbacks or cancel the
+    underlying task.
+    """
+
+    def __init__(self, name="edge-tts-event-loop"):
+        self.name = name
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._futures = {}  # Future returned by submit -> event set once its task has ended
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def start(self):
+        """Start the loop thread if it is not running yet"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            try:
+                # Give cancelled tasks a chance to close their connections
+                pending = asyncio.all_tasks(self._loop)
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    self._loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            finally:
+                self._loop.close()
+                logging.info("Event loop service stopped")
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the loop
+
+        Returns:
+            concurrent.futures.Future: Resolves with the coroutine result;
+            cancelling it cancels the task on the loop
+        """
+        if not self._thread or not self._thread.is_alive():
+            self.start()
+        future = concurrent.futures.Future()
+        finished = threading.Event()
+        with self._lock:
+            self._futures[future] = finished
+
+        def task_done(task):
+            if not future.done():
+                try:
+                    if task.cancelled():
+                        future.cancel()
+                    elif task.exception() is not None:
+                        future.set_exception(task.exception())
+                    else:
+                        future.set_result(task.result())
+                except concurrent.futures.InvalidStateError:
+                    pass  # Cancelled from another thread in the meantime
+            self._discard(future)
+            finished.set()
+
+        def start():
+            if future.cancelled():
+                # Cancelled before it was scheduled: the coroutine never runs
+                coro.close()
+                self._discard(future)
+                finished.set()
+                return
+            task = self._loop.create_task(coro)
+            task.add_done_callback(task_done)
+            future.add_done_callback(lambda f: f.cancelled() and self._loop.call_soon_threadsafe(task.cancel))
+
+        self._loop.call_soon_threadsafe(start)
+        return future
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        return self.submit(coro).result(timeout)
+
+    def cancel(self, future):
+        """Cancel a future returned by submit"""
+        if future is not None and not future.done():
+            future.cancel()
+
+    def wait_finished(self, future, timeout=None):
+        """
+        Block until the task behind a future returned by submit has ended
+
+        A cancelled future is done at once, while its task may still be
+        running cleanup such as closing the files it writes.
+
+        Returns:
+            bool: False if the task was still running after timeout seconds
+        """
+        with self._lock:
+            finished = self._futures.get(future)
+        return finished is None or finished.wait(timeout)
+
+    def cancel_all(self):
+        """Cancel every task that is still pending"""
+        with self._lock:
+            futures = list(self._futures)
+        for future in futures:
+            self.cancel(future)
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.pop(future, None)
+
+    def shutdown(self, timeout=2):
+        """Cancel pending tasks and stop the loop thread"""
+        if not self._thread or not self._thread.is_alive():
+            return
+        self.cancel_all()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,143 @@
+import os
+import json
+import logging
+
+PARTIAL_SUFFIX = ".partial"  # Audio written so far, renamed to the final path when done
+JOURNAL_SUFFIX = ".journal"  # Appended to the partial path
+JOURNAL_VERSION = 1
+
+class ExportJournal:
+    """
+    Crash-safe record of the chunks written to a partial export
+
+    The journal is a JSON-lines file next to the partial output. The first
+    line describes the job (text, voice settings and chunk boundaries), and
+    each following line records a chunk whose audio has been flushed to the
+    partial file. Lines are only appended after the audio is on disk, so an
+    interrupted export resumes after the last recorded chunk, and a torn
+    final line is ignored.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.partial_path = output_path + PARTIAL_SUFFIX
+        self.path = self.partial_path + JOURNAL_SUFFIX
+        self.text = ""
+        self.voice = None
+        self.rate = None
+        self.pitch = None
+        self.chunks = []  # (offset, chunk_text) as the text was split for this job
+        self.completed = []  # One entry per recorded chunk, in order
+
+    def start(self, text, voice, rate, pitch, chunks):
+        """Write the job description and create an empty partial file"""
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.pitch = pitch
+        self.chunks = list(chunks)
+        self.completed = []
+        header = {
+            'version': JOURNAL_VERSION,
+            'output': self.output_path,
+            'text': text,
+            'voice': voice,
+            'rate': rate,
+            'pitch': pitch,
+            'chunks': [[offset, len(chunk_text)] for offset, chunk_text in self.chunks],
+        }
+        with open(self.partial_path, 'wb'):
+            pass
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a journal written by an earlier run
+
+        Returns:
+            ExportJournal: The journal, or None if it is missing or unusable
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+            header = json.loads(lines[0])
+            if header.get('version') != JOURNAL_VERSION:
+                return None
+            journal = cls(header['output'])
+            if journal.path != path or not os.path.exists(journal.partial_path):
+                return None
+            journal.text = header['text']
+            journal.voice = header['voice']
+            journal.rate = header['rate']
+            journal.pitch = header['pitch']
+            journal.chunks = [(offset, journal.text[offset:offset + length]) for offset, length in header['chunks']]
+            for line in lines[1:]:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # Torn write at the moment of the crash
+                if entry['index'] != len(journal.completed):
+                    break
+                journal.completed.append(entry)
+            # The partial file must hold at least the recorded audio
+            if os.path.getsize(journal.partial_path) < journal.written_bytes:
+                logging.warning(f"Partial export {journal.partial_path} is shorter than its journal")
+                journal.completed = []
+            return journal
+        except Exception as e:
+            logging.warning(f"Unreadable export journal {path}: {e}")
+            return None
+
+    @property
+    def next_index(self):
+        """Index of the first chunk that still has to be synthesized"""
+        return len(self.completed)
+
+    @property
+    def written_bytes(self):
+        return self.completed[-1]['end'] if self.completed else 0
+
+    @property
+    def written_duration(self):
+        """Seconds of audio recorded in the journal"""
+        return self.completed[-1]['end_time'] if self.completed else 0.0
+
+    def word_timings(self):
+        """Word timings of the recorded chunks, on the timeline of the whole export"""
+        return [timing for entry in self.completed for timing in entry['timings']]
+
+    def open_partial(self):
+        """Open the partial file for appending after the last recorded chunk"""
+        with open(self.partial_path, 'r+b') as f:
+            f.truncate(self.written_bytes)
+        return open(self.partial_path, 'ab')
+
+    def record(self, index, key, start, end, end_time, timings):
+        """Record a chunk whose audio has been flushed to the partial file"""
+        entry = {'index': index, 'key': key, 'start': start, 'end': end, 'end_time': end_time, 'timings': timings}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.completed.append(entry)
+
+    def commit(self):
+        """Move the finished export to its final path and remove the journal"""
+        os.replace(self.partial_path, self.output_path)
+        self._remove(self.path)
+
+    def discard(self):
+        """Abandon the export, removing the partial file and the journal"""
+        self._remove(self.partial_path)
+        self._remove(self.path)
+
+    def _remove(self, path):
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logging.warning(f"Failed to remove {path}: {e}")
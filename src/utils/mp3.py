@@ -0,0 +1,230 @@
+import os
+from array import array
+from bisect import bisect_right
+from itertools import islice
+
+# Bitrates in kbps, indexed by the header's bitrate index (0 = free format)
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Sample rates indexed by the header's version bits (MPEG 2.5, reserved, MPEG 2, MPEG 1)
+_SAMPLE_RATES = {
+    0: (11025, 12000, 8000),
+    2: (22050, 24000, 16000),
+    3: (44100, 48000, 32000),
+}
+
+HEADER_SCAN_BYTES = 64 * 1024  # How much of a file to read when looking for the first frame
+CBR_PROBE_FRAMES = 8  # Frames compared to decide a stream is constant bitrate
+
+def parse_frame_header(header):
+    """
+    Parse a 4-byte MPEG audio frame header
+
+    Returns:
+        dict: frame length, samples per frame, sample rate, bitrate and
+        mono flag, or None if the bytes are not a valid header
+    """
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (header[1] >> 3) & 0x03
+    layer_bits = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    sample_rate_index = (header[2] >> 2) & 0x03
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    layer = 4 - layer_bits
+    mpeg1 = version_bits == 3
+    bitrate = _BITRATES[(1 if mpeg1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header[2] >> 1) & 0x01
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        'length': length,
+        'samples': samples,
+        'sample_rate': sample_rate,
+        'bitrate': bitrate,
+        'mpeg1': mpeg1,
+        'mono': (header[3] >> 6) == 3,
+    }
+
+def skip_id3v2(data):
+    """Return the offset of the first byte after a leading ID3v2 tag"""
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+def find_frame(data, start=0):
+    """Find the offset of the next frame whose successor is also a valid frame"""
+    pos = data.find(b'\xff', start)
+    while 0 <= pos <= len(data) - 4:
+        header = parse_frame_header(data[pos:pos + 4])
+        if header:
+            following = pos + header['length']
+            # Accept the last frame in the buffer, otherwise require a second sync
+            if following + 4 > len(data) or parse_frame_header(data[following:following + 4]):
+                return pos
+        pos = data.find(b'\xff', pos + 1)
+    return -1
+
+def iter_frames(data, start=0):
+    """Yield (offset, header) for consecutive frames in data"""
+    pos = find_frame(data, start)
+    while 0 <= pos <= len(data) - 4:
+        header = parse_frame_header(data[pos:pos + 4])
+        if not header:
+            pos = find_frame(data, pos + 1)
+            continue
+        yield pos, header
+        pos += header['length']
+
+def _vbr_frame_count(data, pos, header):
+    """Read the frame count from a Xing/Info or VBRI header in the first frame"""
+    if header['mpeg1']:
+        side_info = 17 if header['mono'] else 32
+    else:
+        side_info = 9 if header['mono'] else 17
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info') and len(data) >= xing + 12:
+        flags = int.from_bytes(data[xing + 4:xing + 8], 'big')
+        if flags & 0x01:
+            return int.from_bytes(data[xing + 8:xing + 12], 'big')
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI' and len(data) >= vbri + 18:
+        return int.from_bytes(data[vbri + 14:vbri + 18], 'big')
+    return None
+
+def audio_duration(data):
+    """Duration in seconds of in-memory MP3 data, summed from its frame headers"""
+    duration = 0.0
+    for _, header in iter_frames(data, skip_id3v2(data)):
+        duration += header['samples'] / header['sample_rate']
+    return duration
+
+def get_mp3_duration(path):
+    """
+    Get the duration of an MP3 file without decoding it
+
+    Uses a Xing/Info or VBRI header when present. A constant bitrate stream
+    is measured from its size and bitrate, and anything else by walking the
+    frame headers.
+
+    Returns:
+        float: Duration in seconds, or None if no MP3 frames were found
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        data = f.read(HEADER_SCAN_BYTES)
+        start = skip_id3v2(data)
+        if start >= len(data):
+            f.seek(start)
+            data = f.read(HEADER_SCAN_BYTES)
+            base, start = start, 0
+        else:
+            base = 0
+
+        pos = find_frame(data, start)
+        if pos < 0:
+            return None
+        first = parse_frame_header(data[pos:pos + 4])
+
+        frames = _vbr_frame_count(data, pos, first)
+        if frames is not None:
+            return frames * first['samples'] / first['sample_rate']
+
+        probe = [header for _, header in islice(iter_frames(data, pos), CBR_PROBE_FRAMES)]
+        if len(probe) == CBR_PROBE_FRAMES and all(h['bitrate'] == first['bitrate'] for h in probe):
+            return (file_size - base - pos) * 8 / first['bitrate']
+
+        # Variable bitrate without a header: hop from frame header to frame header
+        duration = 0.0
+        offset = base + pos
+        while True:
+            f.seek(offset)
+            header = parse_frame_header(f.read(4))
+            if not header:
+                break
+            duration += header['samples'] / header['sample_rate']
+            offset += header['length']
+        return duration
+
+class Mp3SeekIndex:
+    """
+    Byte offsets and start times of the frames in an MP3 stream
+
+    The index is built incrementally with feed() while the audio is being
+    written, so seeking never has to scan or decode the file.
+    """
+
+    def __init__(self):
+        self.offsets = array('q')
+        self.times = array('d')
+        self.duration = 0.0
+        self.total_bytes = 0
+        self._pending = b''  # Incomplete frame carried over to the next feed
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def indexed_bytes(self):
+        """Bytes of the stream covered by complete frames"""
+        return self.total_bytes - len(self._pending)
+
+    @classmethod
+    def from_file(cls, path, block_size=1024 * 1024):
+        """Build an index for an existing MP3 file"""
+        index = cls()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                index.feed(block)
+        return index
+
+    def feed(self, data):
+        """Index the frames in the next piece of the stream"""
+        buffer = self._pending + data
+        base = self.total_bytes - len(self._pending)
+        pos = skip_id3v2(buffer) if self.total_bytes == 0 else 0
+        while pos + 4 <= len(buffer):
+            header = parse_frame_header(buffer[pos:pos + 4])
+            if not header:
+                # Lost sync: skip ahead to the next possible frame
+                next_sync = buffer.find(b'\xff', pos + 1)
+                pos = next_sync if next_sync >= 0 else len(buffer)
+                continue
+            if pos + header['length'] > len(buffer):
+                break
+            self.offsets.append(base + pos)
+            self.times.append(self.duration)
+            self.duration += header['samples'] / header['sample_rate']
+            pos += header['length']
+        self._pending = buffer[pos:]
+        self.total_bytes += len(data)
+
+    def seek(self, seconds):
+        """
+        Find the frame that contains the given time
+
+        Returns:
+            tuple: (frame_start_time, byte_offset), or (0.0, 0) if the index is empty
+        """
+        if not self.offsets:
+            return 0.0, 0
+        index = max(bisect_right(self.times, seconds) - 1, 0)
+        return self.times[index], self.offsets[index]
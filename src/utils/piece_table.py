@@ -0,0 +1,75 @@
+from array import array
+from bisect import bisect_right
+
+class PieceTable:
+    """
+    Editable text stored as pieces of immutable buffers
+
+    The original text is kept as loaded and inserted text is appended to
+    buffers of its own, so an edit only splits the piece list instead of
+    copying the whole text. Reading a slice only joins the pieces it covers.
+    """
+
+    def __init__(self, text=""):
+        self._buffers = [text]
+        # (buffer index, start, length) in document order
+        self._pieces = [(0, 0, len(text))] if text else []
+        self._starts = array('q')
+        self._length = 0
+        self._reindex()
+
+    def _reindex(self):
+        """Recompute the document offset at which each piece starts"""
+        self._starts = array('q')
+        pos = 0
+        for _, _, length in self._pieces:
+            self._starts.append(pos)
+            pos += length
+        self._length = pos
+
+    def __len__(self):
+        return self._length
+
+    def text(self, start=0, end=None):
+        """Return the document text between two offsets"""
+        end = self._length if end is None else min(end, self._length)
+        start = max(start, 0)
+        if start >= end:
+            return ""
+        parts = []
+        index = bisect_right(self._starts, start) - 1
+        while index < len(self._pieces) and self._starts[index] < end:
+            buffer, piece_start, length = self._pieces[index]
+            piece_offset = self._starts[index]
+            lo = max(start - piece_offset, 0)
+            hi = min(end - piece_offset, length)
+            parts.append(self._buffers[buffer][piece_start + lo:piece_start + hi])
+            index += 1
+        return "".join(parts)
+
+    def _split(self, offset):
+        """Make offset fall on a piece boundary and return the index of the piece starting there"""
+        if offset >= self._length:
+            return len(self._pieces)
+        index = bisect_right(self._starts, offset) - 1
+        piece_offset = self._starts[index]
+        if piece_offset == offset:
+            return index
+        buffer, start, length = self._pieces[index]
+        cut = offset - piece_offset
+        self._pieces[index:index + 1] = [(buffer, start, cut), (buffer, start + cut, length - cut)]
+        self._starts.insert(index + 1, offset)
+        return index + 1
+
+    def replace(self, start, end, text):
+        """Replace the text between two offsets"""
+        start = min(max(start, 0), self._length)
+        end = min(max(end, start), self._length)
+        first = self._split(start)
+        last = self._split(end)
+        pieces = []
+        if text:
+            self._buffers.append(text)
+            pieces.append((len(self._buffers) - 1, 0, len(text)))
+        self._pieces[first:last] = pieces
+        self._reindex()
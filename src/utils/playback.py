@@ -0,0 +1,35 @@
+import threading
+
+class PlaybackController:
+    """
+    Track the lifetime of a playback
+
+    Threads waiting for playback to end block on an event instead of
+    polling the mixer; finish() and stop() release them.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.done.set()
+        self.is_active = False
+
+    def begin(self):
+        """Mark the start of a playback; wait() blocks until it ends"""
+        self.is_active = True
+        self.done.clear()
+
+    def finish(self):
+        """Playback reached the end of the audio"""
+        self._end()
+
+    def stop(self):
+        """Playback was stopped before the end"""
+        self._end()
+
+    def _end(self):
+        self.is_active = False
+        self.done.set()
+
+    def wait(self, timeout=None):
+        """Block until the current playback finishes or is stopped"""
+        return self.done.wait(timeout)
@@ -0,0 +1,193 @@
+import asyncio
+import contextlib
+import logging
+import time
+
+DEFAULT_CHARS_PER_SECOND = 1500  # Sustained characters sent to the service per second
+DEFAULT_BURST_CHARS = 8000  # Characters that can be sent at once after an idle period
+INITIAL_CONCURRENCY = 4  # Streams allowed before any feedback has been measured
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 8  # Upper bound across foreground and background synthesis
+DECREASE_FACTOR = 0.5  # Multiplicative decrease on errors, throttling or slow responses
+LATENCY_TOLERANCE = 2.0  # A first response slower than this multiple of the baseline counts as congestion
+LATENCY_SMOOTHING = 0.2  # Weight of a new sample in the latency baseline
+FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+OPEN_SECONDS = 30.0  # Time the circuit stays open before a trial request is let through
+THROTTLE_STATUSES = (429, 503)
+
+class CircuitOpenError(ConnectionError):
+    """The service failed repeatedly and requests are being held back"""
+
+def is_throttle_error(error):
+    """Whether an error is the service asking us to slow down"""
+    return getattr(error, 'status', None) in THROTTLE_STATUSES
+
+class TokenBucket:
+    """Limit the rate of a quantity (here characters) with bursts up to capacity"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount):
+        """Wait until amount tokens are available and take them"""
+        # Requests larger than the bucket would never fit, so they take all of it
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class _Permit:
+    """Handed to the holder of a request slot to report when the response starts"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.first_byte_at = None
+
+    def first_byte(self):
+        if self.first_byte_at is None:
+            self.first_byte_at = time.monotonic()
+
+    @property
+    def latency(self):
+        """Seconds until the first byte arrived, or so far if it has not"""
+        return (self.first_byte_at or time.monotonic()) - self.started
+
+class RateLimiter:
+    """
+    Shared gate for every request sent to the TTS service
+
+    Each request takes its length in characters from a token bucket and
+    holds one of a number of concurrency slots while it streams. The number
+    of slots follows AIMD: it grows by about one per round of successful
+    requests and is halved on errors, throttling or responses that start
+    much later than usual. Decreases only count feedback
+    from requests started after the previous decrease, so one burst of
+    failures halves the limit once. After repeated consecutive failures the
+    circuit opens and requests fail fast until a trial request succeeds.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, chars_per_second=DEFAULT_CHARS_PER_SECOND, burst_chars=DEFAULT_BURST_CHARS,
+                 initial_concurrency=INITIAL_CONCURRENCY, max_concurrency=MAX_CONCURRENCY, failure_errors=(Exception,)):
+        self.failure_errors = failure_errors  # Errors that count as the service failing
+        self.bucket = TokenBucket(chars_per_second, burst_chars)
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.active = 0
+        self.latency = None  # Smoothed seconds to the first byte of successful requests
+        self.failures = 0  # Consecutive failed requests
+        self.opened_at = None  # When the circuit opened, None while closed
+        self.trial_running = False
+        self._last_decrease = 0.0
+        self._condition = None
+
+    def configure(self, chars_per_second=None, max_concurrency=None):
+        """Change the limits; takes effect for the next requests"""
+        if chars_per_second:
+            self.bucket.rate = chars_per_second
+        if max_concurrency:
+            self.max_concurrency = max(MIN_CONCURRENCY, int(max_concurrency))
+            self.limit = min(self.limit, self.max_concurrency)
+
+    def _check_circuit(self):
+        """Raise if the circuit is open; returns whether this request is the half-open trial"""
+        if self.opened_at is None:
+            return False
+        remaining = self.opened_at + OPEN_SECONDS - time.monotonic()
+        if remaining > 0 or self.trial_running:
+            raise CircuitOpenError(
+                f"TTS service unavailable after {self.failures} failed requests, "
+                f"retrying in {max(remaining, 0):.0f}s"
+            )
+        self.trial_running = True
+        return True
+
+    @contextlib.asynccontextmanager
+    async def request(self, chars):
+        """
+        Hold a slot for one request of chars characters
+
+        Usage:
+            async with limiter.request(len(text)) as permit:
+                ... stream the synthesis, calling permit.first_byte() ...
+
+        Raises:
+            CircuitOpenError: If the service is failing and requests are held back
+        """
+        trial = self._check_circuit()
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        try:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self.active < max(int(self.limit), MIN_CONCURRENCY))
+                self.active += 1
+        except BaseException:
+            if trial:
+                self.trial_running = False
+            raise
+        permit = None
+        try:
+            await self.bucket.acquire(chars)
+            permit = _Permit()
+            yield permit
+        except self.failure_errors as e:
+            if permit is not None:
+                self._on_failure(e, permit.started)
+            raise
+        else:
+            self._on_success(permit.latency, permit.started)
+        finally:
+            if trial:
+                self.trial_running = False
+            # Release synchronously so a cancellation cannot leak the slot
+            self.active -= 1
+            asyncio.get_running_loop().create_task(self._notify())
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+    def _on_success(self, latency, started):
+        self.failures = 0
+        if self.opened_at is not None:
+            logging.info("TTS service recovered, closing circuit")
+            self.opened_at = None
+        slow = self.latency is not None and latency > self.latency * LATENCY_TOLERANCE
+        # The baseline keeps adapting, so a service that stays slower is not penalized forever
+        self.latency = latency if self.latency is None else (
+            (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * latency
+        )
+        if slow:
+            self._decrease(started, f"slow response ({latency:.2f}s to first byte)")
+        else:
+            # Additive increase: about one slot per round of successful requests
+            self.limit = min(self.limit + 1 / self.limit, self.max_concurrency)
+
+    def _on_failure(self, error, started):
+        self.failures += 1
+        reason = "throttled" if is_throttle_error(error) else f"error ({error})"
+        self._decrease(started, reason)
+        if self.failures >= FAILURE_THRESHOLD or self.opened_at is not None:
+            if self.opened_at is None:
+                logging.warning(f"Opening circuit after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+    def _decrease(self, started, reason):
+        if started < self._last_decrease:
+            return  # Feedback about the load before the last decrease
+        self._last_decrease = time.monotonic()
+        previous = int(self.limit)
+        self.limit = max(self.limit * DECREASE_FACTOR, MIN_CONCURRENCY)
+        if int(self.limit) < previous:
+            logging.info(f"Synthesis concurrency reduced to {int(self.limit)}: {reason}")
@@ -0,0 +1,71 @@
+import logging
+
+from utils.synthesis import split_text_into_chunks, iter_synthesized_chunks, leading_paragraphs
+from utils.synthesis_cache import make_cache_key
+
+READ_AHEAD_PARAGRAPHS = 3  # Paragraphs after the spoken text synthesized in the background
+READ_AHEAD_CONCURRENCY = 2  # Streams used for read-ahead, leaving room for foreground work
+
+class ReadAheadScheduler:
+    """
+    Synthesize the paragraphs that follow the spoken text while it plays
+
+    Results are kept in a MemoryChunkStore under the same keys a later
+    synthesis looks up, so reading on into the next paragraph finds its
+    chunks already synthesized. prefetch() does the same for any chunks,
+    such as the sentences typed so far. Only one run per scheduler is in
+    flight at a time.
+    """
+
+    def __init__(self, loop_service, store, paragraphs=READ_AHEAD_PARAGRAPHS, concurrency=READ_AHEAD_CONCURRENCY):
+        self.loop_service = loop_service
+        self.store = store
+        self.paragraphs = paragraphs
+        self.concurrency = concurrency
+        self.future = None
+
+    def schedule(self, text, voice, rate, pitch):
+        """Start synthesizing the first paragraphs of text, replacing any read-ahead in progress"""
+        if self.paragraphs <= 0:
+            self.cancel()
+            return
+        self.prefetch(split_text_into_chunks(leading_paragraphs(text, self.paragraphs)), voice, rate, pitch)
+
+    def prefetch(self, chunks, voice, rate, pitch):
+        """Synthesize the given (offset, chunk_text) chunks that are not stored yet"""
+        self.cancel()
+        chunks = [
+            (offset, chunk_text)
+            for offset, chunk_text in chunks
+            if make_cache_key(chunk_text, voice, rate, pitch) not in self.store
+        ]
+        if not chunks:
+            return
+        logging.info(f"Reading ahead {len(chunks)} chunks")
+        self.future = self.loop_service.submit(self._run(chunks, voice, rate, pitch))
+        self.future.add_done_callback(self._on_done)
+
+    async def _run(self, chunks, voice, rate, pitch):
+        chunk_stream = iter_synthesized_chunks(chunks, voice, rate, pitch, self.concurrency, cache=self.store)
+        try:
+            async for index, _, _ in chunk_stream:
+                logging.debug(f"Read-ahead chunk {index + 1}/{len(chunks)} ready")
+        finally:
+            await chunk_stream.aclose()
+            self.store.flush()
+
+    def _on_done(self, future):
+        if future.cancelled():
+            return
+        if future.exception():
+            logging.warning(f"Read-ahead synthesis failed: {future.exception()}")
+
+    def cancel(self):
+        """Stop the read-ahead in progress, keeping what it already synthesized"""
+        self.loop_service.cancel(self.future)
+        self.future = None
+
+    def invalidate(self):
+        """Stop the read-ahead and discard its results after a text or settings change"""
+        self.cancel()
+        self.store.discard()
@@ -0,0 +1,244 @@
+import codecs
+import logging
+import re
+
+READ_BLOCK_CHARS = 256 * 1024  # Characters tokenized at a time
+DEFAULT_CODEPAGE = 'cp1252'
+MAX_TOKEN_CHARS = 64  # A control word with its parameter never gets longer than this
+
+_SURROGATE = re.compile('[\ud800-\udfff]')
+# Control word, hex escape, control symbol, group delimiters, or a run of plain text
+_TOKEN = re.compile(r"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\([^a-zA-Z])|([{}])|[\r\n]+|([^\\{}\r\n]+)")
+
+# Destinations whose content is not document text
+SKIPPED_DESTINATIONS = frozenset((
+    'aftncn', 'aftnsep', 'aftnsepc', 'annotation', 'atnauthor', 'atndate', 'atnicn', 'atnid', 'atnparent',
+    'atnref', 'atntime', 'atrfend', 'atrfstart', 'author', 'background', 'bkmkend', 'bkmkstart', 'blipuid',
+    'buptim', 'category', 'colorschememapping', 'colortbl', 'comment', 'company', 'creatim', 'datafield',
+    'datastore', 'defchp', 'defpap', 'do', 'doccomm', 'docvar', 'dptxbxtext', 'ebcend', 'ebcstart', 'factoidname',
+    'falt', 'fchars', 'ffdeftext', 'ffentrymcr', 'ffexitmcr', 'ffformat', 'ffhelptext', 'ffl', 'ffname',
+    'ffstattext', 'fldinst', 'fldtype', 'fname', 'fontemb', 'fontfile', 'fonttbl', 'footer', 'footerf',
+    'footerl', 'footerr', 'footnote', 'formfield', 'ftncn', 'ftnsep', 'ftnsepc', 'g', 'generator', 'gridtbl',
+    'header', 'headerf', 'headerl', 'headerr', 'hl', 'hlfr', 'hlinkbase', 'hlloc', 'hlsrc', 'hsv', 'htmltag',
+    'info', 'keycode', 'keywords', 'latentstyles', 'lchars', 'levelnumbers', 'leveltext', 'lfolevel',
+    'linkval', 'list', 'listlevel', 'listname', 'listoverride', 'listoverridetable', 'listpicture',
+    'liststylename', 'listtable', 'listtext', 'lsdlockedexcept', 'macc', 'maccPr', 'mailmerge', 'maln',
+    'malnScr', 'manager', 'margPr', 'mbar', 'mbarPr', 'mbaseJc', 'mbegChr', 'mborderBox', 'mborderBoxPr',
+    'mbox', 'mboxPr', 'mchr', 'mcount', 'mctrlPr', 'md', 'mdeg', 'mdegHide', 'mden', 'mdiff', 'mdPr', 'me',
+    'mendChr', 'meqArr', 'meqArrPr', 'mf', 'mfName', 'mfPr', 'mfunc', 'mfuncPr', 'mgroupChr', 'mgroupChrPr',
+    'mgrow', 'mhideBot', 'mhideLeft', 'mhideRight', 'mhideTop', 'mhtmltag', 'mlim', 'mlimloc', 'mlimlow',
+    'mlimlowPr', 'mlimupp', 'mlimuppPr', 'mm', 'mmaddfieldname', 'mmath', 'mmathPict', 'mmathPr', 'mmaxdist',
+    'mmc', 'mmcJc', 'mmconnectstr', 'mmconnectstrdata', 'mmcPr', 'mmcs', 'mmdatasource', 'mmheadersource',
+    'mmmailsubject', 'mmodso', 'mmodsofilter', 'mmodsofldmpdata', 'mmodsomappedname', 'mmodsoname',
+    'mmodsorecipdata', 'mmodsosort', 'mmodsosrc', 'mmodsotable', 'mmodsoudl', 'mmodsoudldata',
+    'mmodsouniquetag', 'mmPr', 'mmquery', 'mmr', 'mnary', 'mnaryPr', 'mnoBreak', 'mnum', 'mobjDist',
+    'moMath', 'moMathPara', 'moMathParaPr', 'mopEmu', 'mphant', 'mphantPr', 'mplcHide', 'mpos', 'mr',
+    'mrad', 'mradPr', 'mrPr', 'msepChr', 'mshow', 'mshp', 'msPre', 'msPrePr', 'msSub', 'msSubPr', 'msSubSup',
+    'msSubSupPr', 'msSup', 'msSupPr', 'mstrikeBLTR', 'mstrikeH', 'mstrikeTLBR', 'mstrikeV', 'msub',
+    'msubHide', 'msup', 'msupHide', 'mtransp', 'mtype', 'mvertJc', 'mvfmf', 'mvfml', 'mvtof', 'mvtol',
+    'mzeroAsc', 'mzeroDesc', 'mzeroWid', 'nesttableprops', 'nextfile', 'nonesttables', 'objalias',
+    'objclass', 'objdata', 'object', 'objname', 'objsect', 'objtime', 'oldcprops', 'oldpprops',
+    'oldsprops', 'oldtprops', 'oleclsid', 'operator', 'panose', 'password', 'passwordhash', 'pgp',
+    'pgptbl', 'picprop', 'pict', 'pn', 'pnseclvl', 'pntext', 'pntxta', 'pntxtb', 'printim', 'private',
+    'propname', 'protend', 'protstart', 'protusertbl', 'pxe', 'result', 'revtbl', 'revtim', 'rsidtbl',
+    'rxe', 'shp', 'shpgrp', 'shpinst', 'shppict', 'shprslt', 'shptxt', 'sn', 'sp', 'staticval', 'stylesheet',
+    'subject', 'sv', 'svb', 'tc', 'template', 'themedata', 'title', 'txe', 'ud', 'upr', 'userprops',
+    'wgrffmtfilter', 'windowcaption', 'writereservation', 'writereservhash', 'xe', 'xform', 'xmlattrname',
+    'xmlattrvalue', 'xmlclose', 'xmlname', 'xmlnstbl', 'xmlopen',
+))
+
+# Control words that stand for text
+SPECIAL_CHARACTERS = {
+    'par': '\n',
+    'sect': '\n',
+    'page': '\n',
+    'line': '\n',
+    'row': '\n',
+    'tab': '\t',
+    'cell': '\t',
+    'nestcell': '\t',
+    'emdash': '\u2014',
+    'endash': '\u2013',
+    'emspace': '\u2003',
+    'enspace': '\u2002',
+    'qmspace': '\u2005',
+    'bullet': '\u2022',
+    'lquote': '\u2018',
+    'rquote': '\u2019',
+    'ldblquote': '\u201c',
+    'rdblquote': '\u201d',
+    'zwj': '\u200d',
+    'zwnj': '\u200c',
+}
+
+# Control symbols that stand for text
+SPECIAL_SYMBOLS = {
+    '\\': '\\',
+    '{': '{',
+    '}': '}',
+    '~': '\u00a0',
+    '_': '\u2011',
+    '-': '',  # Optional hyphen
+}
+
+# Character sets selected in the RTF header
+CHARACTER_SETS = {'ansi': DEFAULT_CODEPAGE, 'mac': 'mac_roman', 'pc': 'cp437', 'pca': 'cp850'}
+
+# Control words that affect the text; all others only change formatting
+_MEANINGFUL_WORDS = SKIPPED_DESTINATIONS | SPECIAL_CHARACTERS.keys() | CHARACTER_SETS.keys() | {'u', 'uc', 'bin', 'ansicpg'}
+
+class RtfParser:
+    """
+    Incremental RTF to plain text converter
+
+    Text is fed in pieces of any size and tokenized in a single linear pass.
+    Destinations that do not hold document text (font and color tables,
+    pictures, headers, field instructions and the like) are dropped, \\'hh
+    and \\uN escapes are decoded, and paragraph marks become line breaks.
+    """
+
+    def __init__(self):
+        self.codepage = DEFAULT_CODEPAGE
+        self._skip = False  # Inside a destination that is not text
+        self._uc = 1  # Fallback characters that follow a \\uN escape
+        self._stack = []  # (skip, uc) of the enclosing groups
+        self._fallback = 0  # Fallback characters still to drop
+        self._binary = 0  # Characters of \\bin data still to drop
+        self._bytes = bytearray()  # Consecutive \\'hh escapes, decoded together for multi-byte codepages
+        self._out = []
+        self._pending = ''
+
+    def feed(self, data):
+        """Tokenize data and return the text it completes"""
+        data = self._pending + data
+        end = len(data)
+        # Keep a possibly incomplete control word for the next piece
+        cut = data.rfind('\\', max(end - MAX_TOKEN_CHARS, 0))
+        if cut >= 0:
+            # In a run of backslashes, pairs are escaped backslashes; only an
+            # odd one out starts a control word
+            run = cut
+            while run > 0 and data[run - 1] == '\\':
+                run -= 1
+            end = cut if (cut - run) % 2 == 0 else cut + 1
+        self._pending = data[end:]
+        self._tokenize(data, end)
+        return self._take()
+
+    def close(self):
+        """Tokenize what is left and return the remaining text"""
+        data, self._pending = self._pending, ''
+        self._tokenize(data, len(data))
+        self._flush_bytes()
+        return self._take()
+
+    def _take(self):
+        text = ''.join(self._out)
+        self._out = []
+        return text
+
+    def _emit(self, text):
+        if self._skip:
+            return
+        if self._fallback:
+            dropped = min(self._fallback, len(text))
+            self._fallback -= dropped
+            text = text[dropped:]
+        if text:
+            self._out.append(text)
+
+    def _flush_bytes(self):
+        if self._bytes:
+            data = bytes(self._bytes)
+            self._bytes.clear()
+            self._emit(data.decode(self.codepage, errors='replace'))
+
+    def _tokenize(self, data, end):
+        pos = 0
+        while pos < end:
+            if self._binary:
+                # Raw bytes of a \\bin control word, which may contain braces
+                skipped = min(self._binary, end - pos)
+                self._binary -= skipped
+                pos += skipped
+                continue
+            start, pos = pos, end
+            # finditer passes over characters no token matches, such as a lone backslash
+            for match in _TOKEN.finditer(data, start, end):
+                kind = match.lastindex
+                if kind == 3:
+                    if self._fallback:
+                        self._fallback -= 1
+                    elif not self._skip:
+                        self._bytes.append(int(match.group(3), 16))
+                    continue
+                if self._bytes:
+                    self._flush_bytes()
+                if kind == 6:
+                    self._emit(match.group(6))
+                elif kind == 5:
+                    if match.group(5) == '{':
+                        self._stack.append((self._skip, self._uc))
+                    else:
+                        if self._stack:
+                            self._skip, self._uc = self._stack.pop()
+                        self._fallback = 0
+                elif kind == 4:
+                    symbol = match.group(4)
+                    if symbol == '*':
+                        self._skip = True  # Optional destination this parser does not know
+                    elif symbol in SPECIAL_SYMBOLS:
+                        self._emit(SPECIAL_SYMBOLS[symbol])
+                elif kind is not None and match.group(1) in _MEANINGFUL_WORDS:
+                    self._control_word(match.group(1), match.group(2))
+                    if self._binary:
+                        pos = match.end()
+                        break
+
+    def _control_word(self, word, param):
+        if word in SKIPPED_DESTINATIONS:
+            self._skip = True
+        elif word == 'u' and param is not None:
+            code = int(param)
+            self._emit(chr(code + 65536 if code < 0 else code))
+            self._fallback = self._uc
+        elif word == 'uc' and param is not None:
+            self._uc = int(param)
+        elif word == 'bin' and param is not None:
+            self._binary = max(int(param), 0)
+        elif word == 'ansicpg' and param is not None:
+            self.codepage = self._codec(f"cp{param}")
+        elif word in CHARACTER_SETS:
+            self.codepage = CHARACTER_SETS[word]
+        elif word in SPECIAL_CHARACTERS:
+            self._fallback = 0
+            self._emit(SPECIAL_CHARACTERS[word])
+
+    def _codec(self, name):
+        try:
+            return codecs.lookup(name).name
+        except LookupError:
+            logging.warning(f"Unknown RTF codepage {name}, using {DEFAULT_CODEPAGE}")
+            return DEFAULT_CODEPAGE
+
+def read_rtf(filepath):
+    """
+    Read the text of an RTF file
+
+    RTF is 7-bit text with escapes for everything else, so the file is read
+    as Latin-1 and converted block by block.
+
+    Returns:
+        str: The document text, one paragraph per line
+    """
+    parser = RtfParser()
+    parts = []
+    with open(filepath, 'r', encoding='latin-1', newline='') as file:
+        for block in iter(lambda: file.read(READ_BLOCK_CHARS), ''):
+            parts.append(parser.feed(block))
+    parts.append(parser.close())
+    text = ''.join(parts)
+    # \\uN escapes outside the BMP arrive as surrogate pairs
+    if _SURROGATE.search(text):
+        text = text.encode('utf-16', 'surrogatepass').decode('utf-16', errors='replace')
+    return text
@@ -0,0 +1,57 @@
+import asyncio
+import logging
+
+class _Call:
+    """An in-flight task and the number of callers waiting on it"""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent requests into one
+
+    The first caller for a key starts the work; callers that arrive with the
+    same key while it is running wait on the same task and receive the same
+    result or exception. The task is only cancelled once every caller
+    waiting on it has been cancelled. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def run(self, key, factory):
+        """
+        Run factory() for key, or join the call already running for it
+
+        Args:
+            key: Hashable identity of the request
+            factory: Callable returning the coroutine to run
+
+        Returns:
+            The coroutine's result, shared by every caller of the same call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(factory()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            logging.debug(f"Joining in-flight request {key}")
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Last caller left: nobody needs the result any more, and
+                # new callers must not join a task that is being cancelled
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,97 @@
+import logging
+from bisect import bisect_left, bisect_right
+
+from utils.mp3 import Mp3SeekIndex
+from utils.synthesis import split_text_into_sentences, rebase_word_timings, MAX_CHUNK_CHARS
+from utils.synthesis_cache import make_cache_key
+
+SESSION_MAX_BYTES = 64 * 1024 * 1024  # Per-sentence audio kept from recent syntheses
+
+def split_chunk_audio(chunk_text, audio, timings, max_chars=MAX_CHUNK_CHARS):
+    """
+    Cut the audio of a synthesized chunk into one piece per sentence
+
+    Cuts are placed at the MP3 frame closest to the middle of the pause
+    between the last word of a sentence and the first word of the next, so
+    the pieces can be played back to back or spliced between other audio.
+
+    Args:
+        chunk_text: Text the audio was synthesized from
+        audio: MP3 data of the chunk
+        timings: Word timings relative to the chunk
+        max_chars: Sentence length limit used when the text was chunked
+
+    Returns:
+        list: (sentence_text, audio_bytes, word_timings) per sentence with
+        timings relative to the piece, or an empty list if the words cannot
+        be matched to sentences
+    """
+    sentences = split_text_into_sentences(chunk_text, max_chars)
+    if len(sentences) == 1:
+        return [(sentences[0][1], audio, timings)]
+    if not sentences or not timings:
+        return []
+
+    # Group the words by the sentence they fall in
+    sentence_starts = [offset for offset, _ in sentences]
+    groups = [[] for _ in sentences]
+    for timing in timings:
+        groups[max(bisect_right(sentence_starts, timing['char_offset']) - 1, 0)].append(timing)
+    if not all(groups):
+        return []
+
+    frames = Mp3SeekIndex()
+    frames.feed(audio)
+    if not len(frames):
+        return []
+
+    # Cut at the frame nearest to the middle of each pause between sentences
+    cuts = [(0.0, 0)]
+    for previous, following in zip(groups, groups[1:]):
+        pause = (previous[-1]['end'] + following[0]['start']) / 2
+        frame = min(bisect_left(frames.times, pause), len(frames) - 1)
+        if frames.offsets[frame] <= cuts[-1][1]:
+            return []
+        cuts.append((frames.times[frame], frames.offsets[frame]))
+    cuts.append((frames.duration, len(audio)))
+
+    pieces = []
+    for (offset, sentence), group, (start_time, start_byte), (_, end_byte) in zip(sentences, groups, cuts, cuts[1:]):
+        pieces.append((sentence, audio[start_byte:end_byte], rebase_word_timings(group, -start_time, -offset)))
+    return pieces
+
+class SynthesisSession:
+    """
+    Sentence segmentation and per-sentence audio of recent syntheses
+
+    After each synthesized chunk is cut into sentences, the pieces are kept
+    in a memory-only store under their sentence keys. The next synthesis
+    gives the sentences found in the store chunks of their own, so they are
+    spliced in from the store instead of being synthesized again.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def uncached_sentences(self, chunks, voice, rate, pitch):
+        """
+        Count the sentences of chunks whose audio is not in the store
+
+        Returns:
+            tuple: (sentences to synthesize, total sentences)
+        """
+        uncached = total = 0
+        for _, chunk_text in chunks:
+            count = len(split_text_into_sentences(chunk_text))
+            total += count
+            if make_cache_key(chunk_text, voice, rate, pitch) not in self.store:
+                uncached += count
+        return uncached, total
+
+    def record_chunk(self, chunk_text, audio, timings, voice, rate, pitch):
+        """Keep the per-sentence audio of a chunk; timings are relative to the chunk"""
+        pieces = split_chunk_audio(chunk_text, audio, timings)
+        if not pieces:
+            logging.debug("Could not split chunk audio into sentences")
+        for sentence, piece_audio, piece_timings in pieces:
+            self.store.keep(make_cache_key(sentence, voice, rate, pitch), piece_audio, piece_timings)
@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import random
+import re
+from bisect import bisect_left
+
+import aiohttp
+import edge_tts
+
+from utils.mp3 import audio_duration, Mp3SeekIndex
+from utils.rate_limiter import RateLimiter, CircuitOpenError
+from utils.single_flight import SingleFlight
+from utils.synthesis_cache import make_cache_key
+
+MAX_CHUNK_CHARS = 2000  # Upper bound on characters sent in a single stream
+DEFAULT_CONCURRENCY = 4  # Number of chunks synthesized at the same time
+TICKS_PER_SECOND = 10_000_000  # Edge TTS offsets are in 100ns ticks
+OUTPUT_BITRATE = 48000  # Edge TTS streams audio-24khz-48kbitrate-mono-mp3
+RESUME_ATTEMPTS = 4  # Connections tried per chunk before giving up
+RESUME_INITIAL_DELAY = 1.0  # Seconds before the first reconnect, doubled after each failure
+RESUME_MAX_DELAY = 10.0  # Upper bound on the reconnect delay
+WORD_TAIL = 0.05  # Seconds of audio kept after the last complete word when a stream drops
+
+# Streams in flight on the event loop, shared by identical concurrent requests
+_in_flight = SingleFlight()
+
+# Errors after which a dropped stream is resumed rather than failed
+CONNECTION_ERRORS = (aiohttp.ClientError, ConnectionError, asyncio.TimeoutError, edge_tts.exceptions.WebSocketError)
+
+# Every stream opened to the service, foreground or background, goes through this
+rate_limiter = RateLimiter(failure_errors=CONNECTION_ERRORS)
+
+# Blank lines separate paragraphs; chunks never span a paragraph break
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+# Sentence terminators (with trailing quotes/brackets) or a single line break
+_SENTENCE_BREAK = re.compile(r'[.!?…]+["\'”’)\]]*(?:\s+|$)|[。！？]+\s*|\n+')
+# Text with something to speak; punctuation and symbols alone produce no audio
+_SPEAKABLE = re.compile(r'\w')
+# Text that ends in a finished sentence: a terminator or a line break, then optional spaces
+_SENTENCE_END = re.compile(r'(?:[.!?…。！？]+["\'”’)\]]*|\n)[ \t]*$')
+
+def format_prosody(rate, pitch):
+    """Convert slider values to the rate/pitch strings Edge TTS expects"""
+    # Rate needs to be a percentage string (e.g., "+0%", "+50%", "-50%")
+    rate_percent = int((rate - 1.0) * 100)
+    return f"{rate_percent:+d}%", f"{int(pitch):+d}Hz"
+
+def _block_spans(text):
+    """Yield (start, end) spans of the paragraphs in text"""
+    pos = 0
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        yield pos, match.start()
+        pos = match.end()
+    yield pos, len(text)
+
+def _sentence_spans(text, start, end):
+    """Yield (start, end) spans of the sentences in text[start:end]"""
+    pos = start
+    for match in _SENTENCE_BREAK.finditer(text, start, end):
+        if match.end() > pos:
+            yield pos, match.end()
+            pos = match.end()
+    if pos < end:
+        yield pos, end
+
+def _bounded_spans(start, end, text, max_chars):
+    """Split a span longer than max_chars at whitespace"""
+    while end - start > max_chars:
+        cut = max(text.rfind(' ', start + 1, start + max_chars),
+                  text.rfind('\n', start + 1, start + max_chars))
+        if cut <= start:
+            cut = start + max_chars
+        yield start, cut
+        start = cut
+    yield start, end
+
+def _append_chunk(chunks, text, start, end):
+    """Append text[start:end] without surrounding whitespace, if not empty"""
+    piece = text[start:end]
+    stripped = piece.lstrip()
+    start += len(piece) - len(stripped)
+    stripped = stripped.rstrip()
+    if stripped:
+        chunks.append((start, stripped))
+
+def split_text_into_chunks(text, max_chars=MAX_CHUNK_CHARS, is_cached=None):
+    """
+    Split text at paragraph and sentence boundaries into size-bounded chunks
+
+    Sentences are packed greedily into chunks of at most max_chars characters.
+    A chunk never crosses a paragraph break, so editing one paragraph leaves
+    the chunks of every other paragraph unchanged. Paragraphs without any
+    word characters, such as a "* * *" scene break, are left out.
+
+    Args:
+        text: Text to split
+        max_chars: Maximum characters per chunk
+        is_cached: Optional predicate on a sentence's text; sentences it
+            accepts become chunks of their own so their stored audio is reused
+
+    Returns:
+        list: (offset, chunk_text) tuples, offset being the position of
+        chunk_text within text
+    """
+    chunks = []
+    for block_start, block_end in _block_spans(text):
+        if not _SPEAKABLE.search(text, block_start, block_end):
+            continue
+        chunk_start = chunk_end = None
+        for sentence_start, sentence_end in _sentence_spans(text, block_start, block_end):
+            for start, end in _bounded_spans(sentence_start, sentence_end, text, max_chars):
+                if is_cached and is_cached(text[start:end].strip()):
+                    if chunk_start is not None:
+                        _append_chunk(chunks, text, chunk_start, chunk_end)
+                        chunk_start = None
+                    _append_chunk(chunks, text, start, end)
+                    continue
+                if chunk_start is not None and end - chunk_start > max_chars:
+                    _append_chunk(chunks, text, chunk_start, chunk_end)
+                    chunk_start = None
+                if chunk_start is None:
+                    chunk_start = start
+                chunk_end = end
+        if chunk_start is not None:
+            _append_chunk(chunks, text, chunk_start, chunk_end)
+    return chunks
+
+def split_text_into_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Split text into sentences, cutting any longer than max_chars at whitespace
+
+    Returns:
+        list: (offset, sentence_text) tuples
+    """
+    sentences = []
+    for block_start, block_end in _block_spans(text):
+        for sentence_start, sentence_end in _sentence_spans(text, block_start, block_end):
+            for start, end in _bounded_spans(sentence_start, sentence_end, text, max_chars):
+                _append_chunk(sentences, text, start, end)
+    return sentences
+
+def completed_sentences(text, max_chars=MAX_CHUNK_CHARS):
+    """Sentences of text, leaving out a final sentence that is still being typed"""
+    sentences = split_text_into_sentences(text, max_chars)
+    if sentences and not _SENTENCE_END.search(text):
+        sentences.pop()
+    return sentences
+
+def leading_paragraphs(text, count):
+    """Return text up to the end of its first count non-empty paragraphs"""
+    end = 0
+    found = 0
+    for start, block_end in _block_spans(text):
+        if found == count:
+            break
+        if text[start:block_end].strip():
+            found += 1
+            end = block_end
+    return text[:end]
+
+def trailing_paragraphs(text, count):
+    """
+    Return the last count paragraphs of text
+
+    Returns:
+        tuple: (offset, paragraphs_text), offset being where they start in text
+    """
+    starts = [start for start, _ in _block_spans(text)]
+    start = starts[-count] if len(starts) >= count else 0
+    return start, text[start:]
+
+def estimate_audio_duration(audio):
+    """Duration in seconds of an Edge TTS MP3 stream, from its frame headers"""
+    # Fall back to the nominal constant bitrate if no frames can be parsed
+    return audio_duration(audio) or len(audio) * 8 / OUTPUT_BITRATE
+
+def make_word_timing(event):
+    """Build a word timing entry from a WordBoundary stream event"""
+    return {
+        'text': event["text"],
+        'offset': event["offset"],
+        'duration': event["duration"],
+        'start': event["offset"] / TICKS_PER_SECOND,  # Convert to seconds
+        'end': (event["offset"] + event["duration"]) / TICKS_PER_SECOND  # Convert to seconds
+    }
+
+def align_word_timings(text, timings):
+    """
+    Store the character offset of each timed word within text
+
+    WordBoundary events only carry audio offsets, so words are located by
+    searching forward from the end of the previous word.
+    """
+    cursor = 0
+    for timing in timings:
+        index = text.find(timing['text'], cursor)
+        if index < 0:
+            index = cursor
+        else:
+            cursor = index + len(timing['text'])
+        timing['char_offset'] = index
+    return timings
+
+def rebase_word_timings(timings, time_offset, char_offset):
+    """Shift word timings by time_offset seconds and char_offset characters"""
+    ticks = int(round(time_offset * TICKS_PER_SECOND))
+    return [
+        dict(
+            timing,
+            offset=timing['offset'] + ticks,
+            start=timing['start'] + time_offset,
+            end=timing['end'] + time_offset,
+            char_offset=timing['char_offset'] + char_offset
+        )
+        for timing in timings
+    ]
+
+def truncate_after_last_word(audio, timings, tail=WORD_TAIL):
+    """
+    Cut partially received audio after the last word that arrived in full
+
+    Returns:
+        tuple: (audio_bytes, duration, complete_timings), cut at an MP3 frame
+        boundary shortly after the end of the last complete word
+    """
+    frames = Mp3SeekIndex()
+    frames.feed(audio)
+    # The last frame may be incomplete, so only indexed frames count as received
+    complete = [timing for timing in timings if timing['end'] <= frames.duration]
+    if not complete:
+        return b'', 0.0, []
+    frame = bisect_left(frames.times, complete[-1]['end'] + tail)
+    if frame >= len(frames):
+        return bytes(audio[:frames.indexed_bytes]), frames.duration, complete
+    return bytes(audio[:frames.offsets[frame]]), frames.times[frame], complete
+
+async def _stream_synthesis(text, voice, rate, pitch, audio, timings):
+    """Stream the synthesis of text, appending to audio and timings as events arrive"""
+    async with rate_limiter.request(len(text)) as permit:
+        # edge-tts 7 sends sentence boundaries by default; highlighting, resuming
+        # and splitting chunk audio into sentences all need word boundaries
+        communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch, boundary="WordBoundary")
+        async for event in communicate.stream():
+            if event["type"] == "audio":
+                permit.first_byte()
+                audio.extend(event["data"])
+            elif event["type"] == "WordBoundary":
+                timings.append(make_word_timing(event))
+
+async def synthesize_chunk(text, voice, rate, pitch, attempts=RESUME_ATTEMPTS):
+    """
+    Synthesize a single chunk of text, resuming if the connection drops
+
+    When a stream fails part way, the audio is kept up to the last word that
+    arrived in full and only the text after that word is requested again.
+    The resumed audio is appended with its timings rebased, and reconnects
+    back off exponentially. Every stream is paced by the shared rate_limiter.
+
+    Returns:
+        tuple: (audio_bytes, word_timings) with timings relative to the chunk
+    """
+    audio = bytearray()
+    timings = []
+    char_offset = 0  # Where the text of the current request starts
+    time_offset = 0.0  # Where the audio of the current request starts
+    failures = 0
+    delay = RESUME_INITIAL_DELAY
+    while True:
+        request_text = text[char_offset:]
+        part_audio = bytearray()
+        part_timings = []
+        try:
+            await _stream_synthesis(request_text, voice, rate, pitch, part_audio, part_timings)
+        except CircuitOpenError:
+            raise  # The service is failing; retrying now would only add to it
+        except CONNECTION_ERRORS as e:
+            failures += 1
+            if failures >= attempts:
+                raise
+            # Keep what arrived up to the last complete word and request the rest
+            kept_audio, kept_duration, kept = truncate_after_last_word(
+                part_audio, align_word_timings(request_text, part_timings)
+            )
+            if kept:
+                audio.extend(kept_audio)
+                timings.extend(rebase_word_timings(kept, time_offset, char_offset))
+                time_offset += kept_duration
+                char_offset += kept[-1]['char_offset'] + len(kept[-1]['text'])
+            if not _SPEAKABLE.search(text, char_offset):
+                break  # Only punctuation or whitespace was left
+            logging.warning(f"Synthesis stream dropped ({e}), resuming at character {char_offset} in {delay:.1f}s")
+            await asyncio.sleep(min(delay + random.uniform(0, 0.1 * delay), RESUME_MAX_DELAY))
+            delay *= 2
+            continue
+        audio.extend(part_audio)
+        timings.extend(rebase_word_timings(align_word_timings(request_text, part_timings), time_offset, char_offset))
+        break
+    return bytes(audio), timings
+
+async def fetch_chunk(text, voice, rate, pitch, cache=None):
+    """
+    Get the audio and word timings of a chunk from the cache or the network
+
+    Identical requests made while a stream for the same key is open (a
+    repeated Speak, a preview, background synthesis) join that stream
+    instead of opening another. Cached and shared timings are re-aligned to
+    text, since the cache key ignores whitespace differences.
+    """
+    key = make_cache_key(text, voice, rate, pitch)
+    cached = cache.get(key) if cache else None
+    if cached:
+        audio, timings = cached
+        return audio, align_word_timings(text, timings)
+    audio, timings = await _in_flight.run(key, lambda: synthesize_chunk(text, voice, rate, pitch))
+    # Every caller gets the same result, so work on a copy of the timings
+    timings = align_word_timings(text, [dict(timing) for timing in timings])
+    if cache and audio and key not in cache:
+        cache.put(key, audio, timings)
+    return audio, timings
+
+async def iter_synthesized_chunks(chunks, voice, rate, pitch, concurrency=DEFAULT_CONCURRENCY, cache=None):
+    """
+    Synthesize chunks concurrently and yield the results in text order
+
+    At most `concurrency` streams are open at once, and only a bounded window
+    of finished chunks is held in memory while waiting for an earlier one.
+
+    Args:
+        chunks: (offset, chunk_text) tuples from split_text_into_chunks
+        voice: Voice short name
+        rate: Rate string, e.g. "+0%"
+        pitch: Pitch string, e.g. "+0Hz"
+        concurrency: Maximum number of simultaneous streams
+        cache: Optional SynthesisCache consulted before the network
+
+    Yields:
+        tuple: (index, audio_bytes, word_timings) with timings rebased onto
+        the timeline and character offsets of the whole text
+    """
+    concurrency = max(1, int(concurrency))
+    semaphore = asyncio.Semaphore(concurrency)
+    window = concurrency * 2
+
+    async def run(chunk_text):
+        async with semaphore:
+            return await fetch_chunk(chunk_text, voice, rate, pitch, cache)
+
+    pending = {}
+    next_index = 0
+    elapsed = 0.0
+    try:
+        for index, (chunk_offset, _) in enumerate(chunks):
+            while next_index < len(chunks) and next_index < index + window:
+                pending[next_index] = asyncio.ensure_future(run(chunks[next_index][1]))
+                next_index += 1
+            audio, timings = await pending.pop(index)
+            yield index, audio, rebase_word_timings(timings, elapsed, chunk_offset)
+            elapsed += estimate_audio_duration(audio)
+    finally:
+        for task in pending.values():
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending.values(), return_exceptions=True)
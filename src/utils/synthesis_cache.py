@@ -0,0 +1,245 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+SYNTHESIS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".edge_tts_gui", "synthesis_cache")
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB
+DEFAULT_MAX_MEMORY_BYTES = 32 * 1024 * 1024  # 32 MB of audio kept in memory
+INDEX_FILENAME = "index.json"
+
+def normalize_text(text):
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return ' '.join(text.split())
+
+def make_cache_key(text, voice, rate, pitch):
+    """Hash of the normalized text and the voice settings it was spoken with"""
+    payload = json.dumps([normalize_text(text), voice, rate, pitch], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class SynthesisCache:
+    """
+    Persistent content-addressed store of synthesized audio and word timings
+
+    Each entry is an MP3 file plus a JSON file of word timings, named by the
+    cache key. A small index keeps entries in least-recently-used order and
+    entries are evicted once the total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=SYNTHESIS_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self.total_bytes = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.entries
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".mp3", base + ".json"
+
+    def _load_index(self):
+        """
+        Load the LRU index and reconcile it with the files on disk
+
+        The index is only written on flush, so after a crash the directory
+        can hold entries it does not know about. Those are adopted as the
+        least recently used, and index entries whose files are gone are
+        dropped.
+        """
+        indexed = OrderedDict()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+            if os.path.exists(index_path):
+                with open(index_path, 'r') as f:
+                    for key, size in json.load(f):
+                        indexed[key] = size
+        except Exception as e:
+            logging.warning(f"Synthesis cache index unreadable, rebuilding: {e}")
+            indexed.clear()
+        on_disk = self._scan_files()
+        for key, size in on_disk.items():
+            if key not in indexed:
+                self.entries[key] = size
+        adopted = len(self.entries)
+        for key, size in indexed.items():
+            if key in on_disk:
+                self.entries[key] = size
+        if adopted or len(self.entries) != len(indexed):
+            logging.info(f"Synthesis cache index reconciled: {adopted} entries adopted from disk")
+            self._dirty = True
+        self.total_bytes = sum(self.entries.values())
+        self._evict()
+
+    def _scan_files(self):
+        """
+        Find the complete entries in the cache directory
+
+        Returns:
+            OrderedDict: key -> size in bytes, oldest access first
+        """
+        found = []
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith(".mp3"):
+                    continue
+                key = entry.name[:-4]
+                audio_path, timings_path = self._paths(key)
+                if not os.path.exists(timings_path):
+                    continue
+                size = entry.stat().st_size + os.path.getsize(timings_path)
+                found.append((entry.stat().st_atime, key, size))
+        except Exception as e:
+            logging.error(f"Failed to scan synthesis cache directory: {e}")
+        return OrderedDict((key, size) for _, key, size in sorted(found))
+
+    def get(self, key):
+        """
+        Look up a cache entry
+
+        Returns:
+            tuple: (audio_bytes, word_timings), or None on a miss
+        """
+        with self._lock:
+            if key not in self.entries:
+                return None
+            audio_path, timings_path = self._paths(key)
+            try:
+                with open(audio_path, 'rb') as f:
+                    audio = f.read()
+                with open(timings_path, 'r', encoding='utf-8') as f:
+                    timings = json.load(f)
+            except Exception as e:
+                logging.warning(f"Dropping unreadable synthesis cache entry {key}: {e}")
+                self._remove(key)
+                return None
+            self.entries.move_to_end(key)
+            self._dirty = True
+            return audio, timings
+
+    def put(self, key, audio, timings):
+        """Store an entry and evict least recently used entries over budget"""
+        with self._lock:
+            audio_path, timings_path = self._paths(key)
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(audio_path, 'wb') as f:
+                    f.write(audio)
+                with open(timings_path, 'w', encoding='utf-8') as f:
+                    json.dump(timings, f, ensure_ascii=False)
+            except Exception as e:
+                logging.warning(f"Failed to write synthesis cache entry {key}: {e}")
+                return False
+            size = len(audio) + os.path.getsize(timings_path)
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+            self._dirty = True
+            self._evict()
+            return True
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            self._remove(key)
+
+    def _remove(self, key):
+        self.total_bytes -= self.entries.pop(key, 0)
+        self._dirty = True
+        for path in self._paths(key):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                logging.warning(f"Failed to remove synthesis cache file {path}: {e}")
+
+    def flush(self):
+        """Write the index to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return True
+            index_path = os.path.join(self.cache_dir, INDEX_FILENAME)
+            try:
+                temp_path = index_path + ".tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(list(self.entries.items()), f)
+                os.replace(temp_path, index_path)
+                self._dirty = False
+                return True
+            except Exception as e:
+                logging.warning(f"Failed to save synthesis cache index: {e}")
+                return False
+
+class MemoryChunkStore:
+    """
+    Bounded in-memory store of synthesized chunks in front of a SynthesisCache
+
+    Holds audio synthesized ahead of time so it can be played without any
+    disk or network round-trip. Lookups fall through to the backing cache,
+    and new entries are written to both. Entries are evicted least recently
+    used first once their audio exceeds max_bytes.
+    """
+
+    def __init__(self, backing=None, max_bytes=DEFAULT_MAX_MEMORY_BYTES):
+        self.backing = backing
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (audio_bytes, word_timings)
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self.entries:
+                return True
+        return self.backing is not None and key in self.backing
+
+    def get(self, key):
+        """
+        Look up an entry in memory, then in the backing cache
+
+        Returns:
+            tuple: (audio_bytes, word_timings), or None on a miss
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+                audio, timings = entry
+                return audio, [dict(timing) for timing in timings]
+        return self.backing.get(key) if self.backing else None
+
+    def keep(self, key, audio, timings):
+        """Store an entry in memory only"""
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous:
+                self.total_bytes -= len(previous[0])
+            self.entries[key] = (audio, [dict(timing) for timing in timings])
+            self.total_bytes += len(audio)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.total_bytes -= len(evicted)
+
+    def put(self, key, audio, timings):
+        """Keep an entry in memory and write it through to the backing cache"""
+        self.keep(key, audio, timings)
+        if self.backing:
+            return self.backing.put(key, audio, timings)
+        return True
+
+    def flush(self):
+        """Write the backing cache index to disk"""
+        return self.backing.flush() if self.backing else True
+
+    def discard(self):
+        """Drop every in-memory entry, leaving the backing cache untouched"""
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,48 @@
+import re
+import tkinter
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Tk 8.6 stores text as UTF-16, so characters outside the Basic Multilingual
+# Plane (emoji, some CJK) take up two column positions in a text index
+TK_COUNTS_UTF16 = tkinter.TkVersion < 8.7
+
+_WIDE_CHAR = re.compile('[\U00010000-\U0010FFFF]')
+
+class TextIndexMap:
+    """
+    Convert character offsets within a text to Tk text widget indices
+
+    Line starts are recorded once, so each conversion is a binary search
+    instead of a walk over the whole text. Offsets are codepoint positions
+    within the synthesized slice, which begins base_offset characters into
+    the widget text.
+    """
+
+    def __init__(self, text, base_offset=0, count_utf16=TK_COUNTS_UTF16):
+        self.base_offset = base_offset
+        self.length = len(text)
+        self.line_starts = array('q', [0])
+        pos = text.find('\n')
+        while pos >= 0:
+            self.line_starts.append(pos + 1)
+            pos = text.find('\n', pos + 1)
+
+        # Line number -> columns of the non-BMP characters on that line
+        self.wide_chars = {}
+        if count_utf16 and not text.isascii():
+            for match in _WIDE_CHAR.finditer(text):
+                line = bisect_right(self.line_starts, match.start())
+                column = match.start() - self.line_starts[line - 1]
+                self.wide_chars.setdefault(line, array('q')).append(column)
+
+    def to_tk_index(self, char_index):
+        """Convert an offset within the synthesized text to a "line.column" index"""
+        offset = min(max(char_index + self.base_offset, 0), self.length)
+        line = bisect_right(self.line_starts, offset)
+        column = offset - self.line_starts[line - 1]
+        wide = self.wide_chars.get(line)
+        if wide:
+            # Each non-BMP character before the column occupies an extra position
+            column += bisect_left(wide, column)
+        return f"{line}.{column}"
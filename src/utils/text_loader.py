@@ -0,0 +1,88 @@
+import codecs
+import logging
+
+from chardet.universaldetector import UniversalDetector
+
+SAMPLE_BYTES = 64 * 1024  # Read from the start of the file to detect its encoding
+DETECT_MAX_BYTES = 1024 * 1024  # Most fed to chardet before settling on its best guess
+DETECT_BLOCK_BYTES = 16 * 1024  # Bytes fed to chardet at a time
+DEFAULT_ENCODING = 'utf-8'
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+def _is_utf8(sample):
+    """Whether sample decodes as UTF-8, allowing a sequence cut off at its end"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def _detect_with_chardet(file, limit=DETECT_MAX_BYTES):
+    """Feed the file to chardet block by block until it is confident or limit bytes were read"""
+    detector = UniversalDetector()
+    read = 0
+    while read < limit and not detector.done:
+        block = file.read(DETECT_BLOCK_BYTES)
+        if not block:
+            break
+        detector.feed(block)
+        read += len(block)
+    detector.close()
+    encoding = detector.result.get('encoding')
+    logging.debug(f"chardet detected {encoding} after {read} bytes "
+                  f"(confidence {detector.result.get('confidence', 0):.2f})")
+    return encoding
+
+def detect_encoding(filepath, sample_bytes=SAMPLE_BYTES):
+    """
+    Detect the encoding of a text file from a bounded sample
+
+    Checks for a BOM, then whether the sample is valid UTF-8 (which covers
+    ASCII), and only then runs chardet's incremental detector, which stops
+    as soon as it is confident.
+
+    Returns:
+        str: Codec name to decode the file with
+    """
+    with open(filepath, 'rb') as file:
+        sample = file.read(sample_bytes)
+        for bom, encoding in _BOMS:
+            if sample.startswith(bom):
+                return encoding
+        if _is_utf8(sample):
+            return 'utf-8'
+        file.seek(0)
+        return _detect_with_chardet(file) or DEFAULT_ENCODING
+
+def read_text_file(filepath):
+    """
+    Read a text file in the encoding detected from its start
+
+    The file is decoded in a single pass. If text after the sample turns out
+    not to be UTF-8 after all, the encoding is detected again over the whole
+    file and decoding starts over.
+
+    Returns:
+        tuple: (text, encoding)
+    """
+    encoding = detect_encoding(filepath)
+    logging.debug(f"Detected encoding: {encoding}")
+    try:
+        with open(filepath, 'r', encoding=encoding) as file:
+            return file.read(), encoding
+    except UnicodeDecodeError:
+        if encoding != 'utf-8':
+            raise
+    with open(filepath, 'rb') as file:
+        encoding = _detect_with_chardet(file, limit=float('inf')) or DEFAULT_ENCODING
+    logging.info(f"File is not UTF-8 past the sample, re-reading as {encoding}")
+    with open(filepath, 'r', encoding=encoding) as file:
+        return file.read(), encoding
@@ -0,0 +1,162 @@
+import logging
+import re
+
+from utils.piece_table import PieceTable
+from utils.text_index import TextIndexMap
+
+LARGE_DOCUMENT_CHARS = 500_000  # Documents longer than this are shown a window at a time
+WINDOW_CHARS = 100_000  # Characters of the document held by the text widget
+PAGE_EDGE = 0.1  # Fraction of the widget's scroll range near either end that pages the window
+LINE_SNAP_CHARS = 2_000  # How far a window boundary may move to land on a line break
+
+_WORD = re.compile(r'\S+')
+
+def count_words(text):
+    return sum(1 for _ in _WORD.finditer(text))
+
+def _common_affixes(old, new):
+    """Length of the common prefix and suffix of two strings, not overlapping"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+class TextWindow:
+    """
+    Show a window of a large document in a text widget
+
+    The document lives in a PieceTable; the widget only holds the
+    characters between start and end, and edits made in the widget are
+    written back to the table before the window moves. Paging follows
+    scrolling (call check_scroll() regularly) and playback (index_of()
+    moves the window to the offset it is asked for).
+    """
+
+    def __init__(self, widget, window_chars=WINDOW_CHARS):
+        self.widget = widget
+        self.window_chars = window_chars
+        self.table = None
+        self.start = 0
+        self.end = 0
+        self.index_map = TextIndexMap("")
+        self._shown = ""  # Window text as last put in the widget or synced
+        self._outside_words = 0  # Words of the document outside the window
+
+    @property
+    def is_active(self):
+        return self.table is not None
+
+    def load(self, text):
+        """Hold text in the table and show its beginning"""
+        self.table = PieceTable(text)
+        self.start = self.end = 0
+        self._shown = ""
+        self._outside_words = count_words(text)
+        self._show_range(*self._window_around(0, 0.0))
+        self.widget.mark_set("insert", "1.0")
+        self.widget.yview_moveto(0)
+        logging.info(f"Large document mode: {len(text)} characters, {self.window_chars} shown at a time")
+
+    def close(self):
+        """Leave large document mode; the widget keeps whatever it shows"""
+        self.table = None
+        self._shown = ""
+        self.index_map = TextIndexMap("")
+
+    def __len__(self):
+        """Length of the whole document, including unsynced edits"""
+        return len(self.table) - (self.end - self.start) + len(self._window_text())
+
+    def _window_text(self):
+        return self.widget.get("1.0", "end-1c")
+
+    def sync(self):
+        """Write edits made in the widget back to the table"""
+        if not self.is_active:
+            return
+        current = self._window_text()
+        if current == self._shown:
+            return
+        prefix, suffix = _common_affixes(self._shown, current)
+        self.table.replace(self.start + prefix, self.end - suffix, current[prefix:len(current) - suffix])
+        self.end = self.start + len(current)
+        self._shown = current
+        self.index_map = TextIndexMap(current)
+
+    def text(self, start=0, end=None):
+        """Text of the document between two offsets"""
+        self.sync()
+        return self.table.text(start, end)
+
+    def word_count(self):
+        return self._outside_words + count_words(self._window_text())
+
+    def to_offset(self, index):
+        """Document offset of a widget index"""
+        return self.start + len(self.widget.get("1.0", index))
+
+    def index_of(self, offset):
+        """Widget index of a document offset, moving the window there if it is outside"""
+        if not self.start <= offset <= self.end or (offset == self.end and self.end < len(self.table)):
+            self.show(offset)
+        return self.index_map.to_tk_index(offset - self.start)
+
+    def show(self, offset, anchor=0.5):
+        """Move the window so that offset sits at anchor (0 top, 1 bottom) within it"""
+        self.sync()
+        start, end = self._window_around(offset, anchor)
+        if (start, end) != (self.start, self.end):
+            self._show_range(start, end)
+
+    def check_scroll(self):
+        """Page the window when the view gets close to either of its ends"""
+        if not self.is_active:
+            return
+        top, bottom = self.widget.yview()
+        if top < PAGE_EDGE and self.start > 0:
+            anchor = 0.75
+        elif bottom > 1 - PAGE_EDGE and self.end < len(self.table):
+            anchor = 0.25
+        else:
+            return
+        # Keep the first visible character at the top of the view
+        first_visible = self.to_offset(self.widget.index("@0,0"))
+        self.show(first_visible, anchor)
+        self.widget.yview(self.index_map.to_tk_index(first_visible - self.start))
+
+    def _window_around(self, offset, anchor):
+        """Window boundaries around offset, snapped to line breaks"""
+        length = len(self.table)
+        start = max(min(int(offset - self.window_chars * anchor), length - self.window_chars), 0)
+        end = min(start + self.window_chars, length)
+        return self._snap(start), self._snap(end)
+
+    def _snap(self, offset):
+        """Move an offset back to just after the nearest line break, if there is one close by"""
+        if offset <= 0 or offset >= len(self.table):
+            return offset
+        before = self.table.text(offset - LINE_SNAP_CHARS, offset)
+        newline = before.rfind('\n')
+        return offset - len(before) + newline + 1 if newline >= 0 else offset
+
+    def _show_range(self, start, end):
+        """Replace the widget contents with the document text between two offsets"""
+        insert = self.to_offset("insert") if self._shown else None
+        old_words = count_words(self._shown)
+        text = self.table.text(start, end)
+        self.widget.delete("1.0", "end")
+        self.widget.insert("1.0", text)
+        # Paging is not an edit: keep it out of the undo stack and the modified flag
+        self.widget.edit_reset()
+        self.widget.edit_modified(False)
+        self._outside_words += old_words - count_words(text)
+        self.start, self.end = start, end
+        self._shown = text
+        self.index_map = TextIndexMap(text)
+        if insert is not None and start <= insert <= end:
+            self.widget.mark_set("insert", self.index_map.to_tk_index(insert - start))
+        logging.debug(f"Text window moved to {start}-{end} of {len(self.table)}")
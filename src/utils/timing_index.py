@@ -0,0 +1,47 @@
+from array import array
+from bisect import bisect_right
+
+class WordTimingIndex:
+    """
+    Compact, array-backed index of word timings for fast lookup by time
+
+    Timings must be appended in playback order. Lookups use binary search
+    over the start times, so finding the word being spoken costs O(log n)
+    regardless of document length.
+    """
+
+    def __init__(self, timings=None):
+        self.starts = array('d')
+        self.ends = array('d')
+        self.offsets = array('q')  # Character offset of each word in the text
+        self.lengths = array('l')  # Length of each word in characters
+        if timings:
+            self.extend(timings)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def extend(self, timings):
+        """Append word timings that follow the ones already indexed"""
+        for timing in timings:
+            self.starts.append(timing['start'])
+            self.ends.append(timing['end'])
+            self.offsets.append(timing['char_offset'])
+            self.lengths.append(len(timing['text']))
+
+    def find(self, current_time, tolerance=0.05):
+        """
+        Find the word being spoken at current_time
+
+        Returns:
+            int: Index of the word, or -1 if no word covers current_time
+        """
+        index = bisect_right(self.starts, current_time + tolerance) - 1
+        if index >= 0 and current_time <= self.ends[index] + tolerance:
+            return index
+        return -1
+
+    def span(self, index):
+        """Character (start, end) span of the word at index"""
+        start = self.offsets[index]
+        return start, start + self.lengths[index]
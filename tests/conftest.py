@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its helpers as top-level "utils" modules from src/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src'))
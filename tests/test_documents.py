@@ -0,0 +1,35 @@
+from utils.documents import open_document
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+def test_html_heading_inside_script_does_not_start_a_chapter(tmp_path):
+    path = _write(tmp_path, 'book.html', (
+        '<html><head><title>t</title>\n'
+        '<script>var x = "<h1>";</script>\n'
+        '<style>/* <h2> */</style>\n'
+        '</head><body>\n'
+        '<!-- <h1>Old</h1>\n'
+        '<h2>Older</h2> -->\n'
+        '<h1>One</h1><p>First.</p>\n'
+        '<h2>Two</h2><p>Second.</p>\n'
+        '</body></html>\n'
+    ))
+    document = open_document(path)
+    assert document.titles == ['One', 'Two']
+    assert [document.read_chapter(i) for i in range(len(document))] == ['One\n\nFirst.', 'Two\n\nSecond.']
+
+def test_markdown_pipe_in_prose_is_kept(tmp_path):
+    path = _write(tmp_path, 'notes.md', (
+        'Text with a | pipe.\n'
+        '\n'
+        '| Name | Value |\n'
+        '|------|-------|\n'
+        '| a | 1 |\n'
+        '\n'
+        'After the table | still prose.\n'
+    ))
+    text = open_document(path).read_chapter(0)
+    assert text == 'Text with a | pipe.\n\nName\tValue\na\t1\n\nAfter the table | still prose.'